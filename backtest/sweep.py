@@ -0,0 +1,215 @@
+"""Parallel hyperparameter sweep over a recorded tick dataset.
+
+Each configuration replays the ticks through MarketData, TradingEnv and
+PPODQNAgent against a SimulatedBroker, in its own worker process. Workers
+memory-map the same tick file, so the dataset is held once in the page
+cache regardless of the number of workers. Finished runs are appended to a
+JSON-lines results file, and re-running the same sweep skips them.
+
+Example:
+    python -m backtest.sweep --ticks ticks.npy --grid grid.json --results sweep.jsonl
+where grid.json maps parameter names to lists of values, e.g.
+    {"lr": [1e-4, 3e-4], "gamma": [0.99, 0.995], "max_account_utilization": [0.05, 0.1]}
+With --random N, a parameter may instead be {"loguniform": [low, high]}, e.g.
+    {"lr": {"loguniform": [1e-5, 1e-3]}, "gamma": [0.99, 0.995]}
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+import numpy as np
+import torch
+from config.settings import settings
+from brokers.simulated import SimulatedBroker
+from data.market_data import MarketData
+from data.tick_store import iter_ticks, load_ticks, symbols_in
+from trading.env import TradingEnv
+from trading.risk_management import RiskEngine
+from trading.rl.agent import PPODQNAgent
+
+logger = logging.getLogger(__name__)
+
+AGENT_PARAMS = {'lr', 'gamma', 'clip_epsilon', 'gae_lambda', 'rollout_size', 'n_epochs', 'batch_size'}
+MARKET_DATA_PARAMS = {'window_size', 'volatility_window', 'momentum_window'}
+RUN_PARAMS = {'max_account_utilization', 'seed'}
+
+# Set once per worker process by _init_worker
+_ticks: Optional[np.ndarray] = None
+_symbols: List[str] = []
+
+
+def grid_configs(grid: Dict[str, list]) -> List[dict]:
+    """Full cartesian product of the grid"""
+    names = sorted(grid)
+    for name in names:
+        if not isinstance(grid[name], list):
+            raise ValueError(f"Grid values for {name} must be a list; distributions need --random")
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+
+def random_configs(space: Dict[str, Union[list, dict]], n: int, seed: int = 0) -> List[dict]:
+    """Random search: lists are sampled uniformly, {"loguniform": [low, high]} log-uniformly"""
+    rng = random.Random(seed)
+    configs = []
+    for _ in range(n):
+        config = {}
+        for name, values in sorted(space.items()):
+            if isinstance(values, dict):
+                if set(values) != {'loguniform'}:
+                    raise ValueError(f"Unsupported distribution for {name}: {values}")
+                low, high = values['loguniform']
+                if not 0 < low <= high:
+                    raise ValueError(f"loguniform bounds for {name} must satisfy 0 < low <= high")
+                config[name] = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+            else:
+                config[name] = rng.choice(values)
+        configs.append(config)
+    return configs
+
+
+def config_key(config: dict) -> str:
+    return json.dumps(config, sort_keys=True)
+
+
+def _init_worker(ticks_path: str):
+    global _ticks, _symbols
+    logging.getLogger().setLevel(logging.WARNING)
+    torch.set_num_threads(1)  # One core per worker; the pool provides the parallelism
+    _ticks = load_ticks(ticks_path)
+    _symbols = symbols_in(_ticks)
+
+
+async def _replay(config: dict) -> dict:
+    unknown = set(config) - AGENT_PARAMS - MARKET_DATA_PARAMS - RUN_PARAMS
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {sorted(unknown)}")
+
+    seed = config.get('seed', 0)
+    torch.manual_seed(seed)
+    np.random.seed(seed)
+    max_utilization = config.get('max_account_utilization', settings.MAX_ACCOUNT_UTILIZATION)
+
+    broker = SimulatedBroker(ticks=iter_ticks(_ticks))
+    account = (await broker.get_accounts())[0]
+    market_data = MarketData(_symbols, **{k: v for k, v in config.items() if k in MARKET_DATA_PARAMS})
+    risk_engine = RiskEngine([account.account_id], _symbols, max_utilization=max_utilization)
+    risk_engine.update_account(account)
+    # Inline updates keep each run single-threaded and independent of wall-clock timing
+    agent_kwargs = {k: v for k, v in config.items() if k in AGENT_PARAMS}
+    agent_kwargs['sync_updates'] = True
+    agents = {
+        symbol: PPODQNAgent(TradingEnv(symbol, account, broker, market_data, risk_engine,
+                                       max_utilization=max_utilization), **agent_kwargs)
+        for symbol in _symbols
+    }
+
+    start_equity = broker.equity()
+    peak, max_drawdown, n_ticks = start_equity, 0.0, 0
+
+    async def on_tick(tick):
+        nonlocal peak, max_drawdown, n_ticks
+        n_ticks += 1
+        risk_engine.update_tick(tick)
+        features = market_data.update(tick)
+        if features:
+            await agents[tick.symbol].process_tick(features)
+        equity = broker.equity()
+        peak = max(peak, equity)
+        max_drawdown = max(max_drawdown, (peak - equity) / peak)
+
+    started = time.perf_counter()
+    await broker.stream_ticks(_symbols, on_tick)
+    seconds = time.perf_counter() - started
+
+    return {
+        'pnl': broker.equity() - start_equity,
+        'max_drawdown': max_drawdown,
+        'trades': broker.trades,
+        'ticks': n_ticks,
+        'seconds': seconds,
+        'ticks_per_sec': n_ticks / seconds if seconds > 0 else 0.0
+    }
+
+
+def run_config(config: dict) -> dict:
+    """Worker entry point: backtest one configuration over the mapped ticks"""
+    try:
+        return {'key': config_key(config), 'config': config, **asyncio.run(_replay(config))}
+    except Exception as e:
+        return {'key': config_key(config), 'config': config, 'error': str(e)}
+
+
+def load_results(path: Path) -> Dict[str, dict]:
+    """Completed runs from a previous (possibly interrupted) sweep"""
+    results = {}
+    if path.exists():
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Partially written line from an interrupted sweep
+                if 'error' not in record:
+                    results[record['key']] = record
+    return results
+
+
+def run_sweep(configs: Iterable[dict], ticks_path: Path, results_path: Path,
+              workers: Optional[int] = None) -> List[dict]:
+    """Run every configuration not already in `results_path` across a process pool"""
+    results = load_results(results_path)
+    pending = [c for c in configs if config_key(c) not in results]
+    logger.info(f"Sweep: {len(results)} runs already complete, {len(pending)} to go")
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                             initializer=_init_worker, initargs=(str(ticks_path),)) as pool, \
+            open(results_path, "a") as out:
+        futures = [pool.submit(run_config, c) for c in pending]
+        for future in as_completed(futures):
+            record = future.result()
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            if 'error' in record:
+                logger.error(f"Run failed for {record['key']}: {record['error']}")
+            else:
+                results[record['key']] = record
+                logger.info(f"Run complete: {record['key']} pnl={record['pnl']:.2f}")
+
+    return sorted(results.values(), key=lambda r: r['pnl'], reverse=True)
+
+
+def format_summary(results: List[dict]) -> str:
+    lines = [f"{'pnl':>12} {'max_dd':>8} {'trades':>7} {'ticks/s':>9}  config"]
+    for r in results:
+        lines.append(f"{r['pnl']:>12.2f} {r['max_drawdown']:>8.2%} {r['trades']:>7} "
+                     f"{r['ticks_per_sec']:>9.0f}  {r['key']}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--ticks", type=Path, required=True, help="Recorded ticks (.npy)")
+    parser.add_argument("--grid", type=Path, required=True, help="JSON parameter grid")
+    parser.add_argument("--results", type=Path, default=Path("sweep_results.jsonl"))
+    parser.add_argument("--random", type=int, default=0, help="Sample N random configs instead of the full grid")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    with open(args.grid) as f:
+        grid = json.load(f)
+    configs = random_configs(grid, args.random) if args.random else grid_configs(grid)
+    print(format_summary(run_sweep(configs, args.ticks, args.results, args.workers)))
+
+
+if __name__ == "__main__":
+    main()
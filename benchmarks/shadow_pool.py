@@ -0,0 +1,117 @@
+"""Production tick latency with and without a ShadowPool of candidate policies.
+
+Ticks arrive on a fixed schedule. For each tick this records how long the
+bot's handler takes (`handle`) and how late the loop got to the tick
+(`delay`), which is where shadow evaluation running between ticks shows up.
+
+Modes:
+    none    - no shadow pool
+    inline  - pool evaluated synchronously inside the tick handler
+    queued  - ticks submitted to the pool, evaluated by its own task
+
+Run from the repository root:
+    python -m benchmarks.shadow_pool
+"""
+import asyncio
+import logging
+import time
+import numpy as np
+import torch
+from brokers.simulated import SimulatedBroker
+from data.market_data import MarketData
+from data.models import Account, Tick
+from main import ScalpingBot
+from trading.env import TradingEnv
+from trading.risk_management import RiskEngine
+from trading.rl.actor_critic import ActorCritic
+from trading.rl.agent import PPODQNAgent
+from trading.shadow import STATE_DIM, ShadowPool
+
+SYMBOLS = ['EUR_USD', 'GBP_USD', 'USD_JPY', 'AUD_USD']
+N_POLICIES = 50
+N_TICKS = 5000
+INTERVAL = 0.004  # 250 ticks/s across all symbols
+
+
+def make_ticks(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    mids = {'EUR_USD': 1.1, 'GBP_USD': 1.3, 'USD_JPY': 150.0, 'AUD_USD': 0.65}
+    ticks = []
+    for i in range(n):
+        symbol = SYMBOLS[i % len(SYMBOLS)]
+        mids[symbol] *= 1 + rng.normal(scale=1e-4)
+        half = mids[symbol] * 5e-6
+        ticks.append(Tick(symbol, mids[symbol] - half, mids[symbol] + half, float(i)))
+    return ticks
+
+
+def make_bot() -> ScalpingBot:
+    bot = ScalpingBot()
+    bot.broker = SimulatedBroker()
+    bot.market_data = MarketData(SYMBOLS)
+    account = Account(bot.broker.account_id, 100000, 100000, 100000, 'SIMULATED')
+    bot.risk_engine = RiskEngine([account.account_id], SYMBOLS)
+    bot.risk_engine.update_account(account)
+    for symbol in SYMBOLS:
+        env = TradingEnv(symbol, account, bot.broker, bot.market_data, bot.risk_engine)
+        # Rollouts never fill, so no training competes with the tick path
+        bot.agents[(account.account_id, symbol)] = PPODQNAgent(env, rollout_size=N_TICKS * 2)
+    bot.running = True
+    return bot
+
+
+async def run(mode: str) -> dict:
+    torch.manual_seed(0)
+    bot = make_bot()
+    pool = None
+    if mode != "none":
+        pool = ShadowPool({f"candidate_{i}": ActorCritic(STATE_DIM, 3) for i in range(N_POLICIES)}, SYMBOLS)
+    if mode == "queued":
+        bot.shadow = pool
+        drain = asyncio.create_task(pool.run())
+
+    ticks = make_ticks(N_TICKS)
+    handle = np.zeros(len(ticks))
+    delay = np.zeros(len(ticks))
+    start = time.perf_counter()
+    for i, tick in enumerate(ticks):
+        scheduled = start + i * INTERVAL
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        started = time.perf_counter()
+        bot.broker.on_tick(tick)
+        await bot.on_tick(tick)
+        if mode == "inline":
+            features = bot.market_data.get_features(tick.symbol)
+            if features:
+                pool.on_tick(tick, features)
+        handle[i] = time.perf_counter() - started
+        delay[i] = started - scheduled
+
+    if mode == "queued":
+        drain.cancel()
+    handle, delay = handle[N_TICKS // 10:] * 1e6, delay[N_TICKS // 10:] * 1e6
+    return {
+        'mode': mode,
+        'handle_us': float(handle.mean()),
+        'handle_p99_us': float(np.percentile(handle, 99)),
+        'delay_us': float(delay.mean()),
+        'delay_p99_us': float(np.percentile(delay, 99)),
+        'evaluated': pool.ticks if pool else 0,
+        'skipped': pool.skipped if pool else 0
+    }
+
+
+async def main():
+    logging.getLogger().setLevel(logging.WARNING)
+    torch.set_num_threads(1)
+    results = [await run(mode) for mode in ("none", "inline", "queued")]
+    base = results[0]['handle_us']
+    print(f"{'mode':<8} {'handle_us':>10} {'p99':>7} {'overhead':>9} {'delay_us':>9} {'p99':>7} "
+          f"{'evaluated':>10} {'skipped':>8}")
+    for r in results:
+        print(f"{r['mode']:<8} {r['handle_us']:>10.0f} {r['handle_p99_us']:>7.0f} {r['handle_us'] / base - 1:>9.0%} "
+              f"{r['delay_us']:>9.0f} {r['delay_p99_us']:>7.0f} {r['evaluated']:>10} {r['skipped']:>8}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,144 @@
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional
+from config.settings import settings
+from data.models import Account, Order, Position, Tick
+from .base import IBroker
+
+logger = logging.getLogger(__name__)
+
+class SimulatedBroker(IBroker):
+    """In-process broker that fills market orders at the last seen bid/ask.
+
+    Used for backtests, with ticks replayed through `stream_ticks`; prices
+    can also be pushed in directly with `on_tick`. No network calls are made.
+    """
+
+    def __init__(self, balance: float = 100000.0, account_id: str = "SIM-001",
+                 ticks: Optional[Iterable[Tick]] = None):
+        self.account_id = account_id
+        self.balance = balance
+        self.ticks = ticks
+        self.prices: Dict[str, Tick] = {}
+        self.positions: Dict[str, List[float]] = {}  # symbol -> [units, average price]
+        self.trades = 0
+        self._next_id = 1
+
+    def on_tick(self, tick: Tick):
+        self.prices[tick.symbol] = tick
+
+    def _to_account_ccy(self, symbol: str, amount: float) -> float:
+        base, quote = symbol.split('_')
+        if quote == settings.ACCOUNT_CURRENCY or symbol not in self.prices:
+            return amount
+        tick = self.prices[symbol]
+        mid = (tick.bid + tick.ask) / 2
+        return amount / mid if base == settings.ACCOUNT_CURRENCY else amount
+
+    def unrealized_pnl(self) -> float:
+        pnl = 0.0
+        for symbol, (units, avg_price) in self.positions.items():
+            tick = self.prices.get(symbol)
+            if tick is None or units == 0:
+                continue
+            exit_price = tick.bid if units > 0 else tick.ask
+            pnl += self._to_account_ccy(symbol, units * (exit_price - avg_price))
+        return pnl
+
+    def equity(self) -> float:
+        return self.balance + self.unrealized_pnl()
+
+    def margin_used(self) -> float:
+        used = 0.0
+        for symbol, (units, avg_price) in self.positions.items():
+            used += abs(self._to_account_ccy(symbol, units * avg_price)) * settings.MARGIN_RATE
+        return used
+
+    async def connect(self) -> bool:
+        return True
+
+    async def get_accounts(self) -> List[Account]:
+        equity = self.equity()
+        return [Account(
+            account_id=self.account_id,
+            balance=self.balance,
+            equity=equity,
+            margin_available=equity - self.margin_used(),
+            broker_name="SIMULATED"
+        )]
+
+    async def get_positions(self, account_id: str) -> List[Position]:
+        return [
+            Position(
+                symbol=symbol,
+                quantity=units,
+                entry_price=avg_price,
+                current_price=(self.prices[symbol].bid + self.prices[symbol].ask) / 2,
+                account_id=account_id
+            )
+            for symbol, (units, avg_price) in self.positions.items()
+            if units != 0 and symbol in self.prices
+        ]
+
+    async def place_order(self, account_id: str, symbol: str, side: str, quantity: float) -> Optional[Order]:
+        tick = self.prices.get(symbol)
+        if tick is None:
+            logger.warning(f"Simulated order rejected, no price for {symbol}")
+            return None
+
+        precision = settings.INSTRUMENT_PRECISION.get(symbol, 2)
+        quantity = round(quantity, precision)
+        if quantity <= 0:
+            return None
+
+        price = tick.ask if side == "buy" else tick.bid
+        self._fill(symbol, quantity if side == "buy" else -quantity, price)
+
+        order = Order(
+            order_id=str(self._next_id),
+            symbol=symbol,
+            side=side,
+            price=price,
+            quantity=quantity,
+            account_id=account_id,
+            timestamp=tick.timestamp
+        )
+        self._next_id += 1
+        self.trades += 1
+        logger.debug(f"Simulated order executed: {order}")
+        return order
+
+    def _fill(self, symbol: str, signed_units: float, price: float):
+        """Net a fill into the position, realising PnL on the closed portion"""
+        units, avg_price = self.positions.get(symbol, [0.0, 0.0])
+        if units == 0 or (units > 0) == (signed_units > 0):
+            new_units = units + signed_units
+            avg_price = (units * avg_price + signed_units * price) / new_units
+            self.positions[symbol] = [new_units, avg_price]
+            return
+
+        closed = min(abs(units), abs(signed_units)) * (1 if units > 0 else -1)
+        self.balance += self._to_account_ccy(symbol, closed * (price - avg_price))
+        new_units = units + signed_units
+        if new_units == 0:
+            self.positions[symbol] = [0.0, 0.0]
+        elif (new_units > 0) == (units > 0):
+            self.positions[symbol] = [new_units, avg_price]
+        else:
+            self.positions[symbol] = [new_units, price]  # Flipped through flat
+
+    async def cancel_order(self, account_id: str, order_id: str) -> bool:
+        # Market orders fill immediately, so there is never anything to cancel
+        return False
+
+    async def stream_ticks(self, symbols: List[str], callback) -> None:
+        """Replay the configured tick source, if any"""
+        if self.ticks is None:
+            return
+        wanted = set(symbols)
+        for tick in self.ticks:
+            if tick.symbol not in wanted:
+                continue
+            self.on_tick(tick)
+            await callback(tick)
+            await asyncio.sleep(0)  # Yield like a real stream so background tasks progress
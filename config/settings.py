@@ -26,10 +26,29 @@ class Settings:
     DEFAULT_LOT_SIZE = 1000  # Standard lot size in units
     MAX_SPREAD = 0.0003  # Maximum allowed spread (3 pips)
 
+    # Risk Engine
+    ACCOUNT_CURRENCY = os.getenv("ACCOUNT_CURRENCY", "USD")
+    MARGIN_RATE = float(os.getenv("MARGIN_RATE", 0.02))  # 50:1 leverage
+    MAX_POSITION_UNITS = float(os.getenv("MAX_POSITION_UNITS", 100000))  # Per instrument, per account
+    ACCOUNT_REFRESH_INTERVAL = float(os.getenv("ACCOUNT_REFRESH_INTERVAL", 30))  # Seconds between broker equity syncs
+
+    # Shadow (paper) trading of candidate policies
+    SHADOW_POLICIES = [p for p in os.getenv("SHADOW_POLICIES", "").split(",") if p]  # Checkpoint paths
+    SHADOW_BALANCE = float(os.getenv("SHADOW_BALANCE", 100000))
+    SHADOW_REPORT_INTERVAL = float(os.getenv("SHADOW_REPORT_INTERVAL", 60))  # Seconds
+
     # Logging Configuration
     LOG_DIR = Path("logs")
     LOG_LEVEL = logging.INFO
     LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+    # Diagnostics
+    DIAGNOSTICS_ENABLED = os.getenv("DIAGNOSTICS_ENABLED", "true").lower() == "true"
+    DIAGNOSTICS_SOCKET = LOG_DIR / "diagnostics.sock"
+    LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", 0.1))  # Seconds between lag samples
+    SLOW_CALLBACK_MS = float(os.getenv("SLOW_CALLBACK_MS", 100))
+    PROFILE_RATE_HZ = int(os.getenv("PROFILE_RATE_HZ", 100))
+    PROFILE_DURATION = float(os.getenv("PROFILE_DURATION", 30))  # Seconds
     
     @classmethod
     def configure_logging(cls):
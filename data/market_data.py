@@ -7,22 +7,117 @@ from trading.rl.utils import check_for_nans
 
 logger = logging.getLogger(__name__)
 
+# Timeframe name -> bar length in seconds
+TIMEFRAMES = {'1s': 1, '5s': 5, '1m': 60, '5m': 300}
+
+class BarBuilder:
+    """Incremental OHLC bars for several timeframes of one symbol.
+
+    Each field is a (n_timeframes, n_bars) ring array, so a tick updates the
+    current bar of every timeframe in O(1) and memory is fixed regardless of
+    the horizon covered. Quiet periods with no ticks produce no bars.
+    """
+
+    def __init__(self, timeframes: Dict[str, int] = TIMEFRAMES, n_bars: int = 60):
+        self.names = list(timeframes)
+        self.seconds = np.array([timeframes[n] for n in self.names], dtype=np.float64)
+        self.n_bars = n_bars
+        shape = (len(self.names), n_bars)
+        self.open = np.zeros(shape)
+        self.high = np.zeros(shape)
+        self.low = np.zeros(shape)
+        self.close = np.zeros(shape)
+        self.ticks = np.zeros(shape, dtype=np.int64)
+        self.spread_sum = np.zeros(shape)
+        self.spread_max = np.zeros(shape)
+        self.start = np.full(shape, -1.0)
+        self.head = np.full(len(self.names), -1, dtype=np.int64)
+        self.count = np.zeros(len(self.names), dtype=np.int64)
+        self._rows = np.arange(len(self.names))
+
+    def update(self, tick: Tick):
+        mid = (tick.bid + tick.ask) / 2
+        spread = tick.ask - tick.bid
+        start = np.floor(tick.timestamp / self.seconds) * self.seconds
+
+        # Roll timeframes whose current bar has closed onto a fresh slot
+        current = self.start[self._rows, np.maximum(self.head, 0)]
+        new = (self.head < 0) | (start > current)
+        if new.any():
+            rows = self._rows[new]
+            self.head[rows] = (self.head[rows] + 1) % self.n_bars
+            self.count[rows] = np.minimum(self.count[rows] + 1, self.n_bars)
+            cols = self.head[rows]
+            self.open[rows, cols] = mid
+            self.high[rows, cols] = mid
+            self.low[rows, cols] = mid
+            self.ticks[rows, cols] = 0
+            self.spread_sum[rows, cols] = 0.0
+            self.spread_max[rows, cols] = 0.0
+            self.start[rows, cols] = start[rows]
+
+        idx = (self._rows, self.head)
+        self.high[idx] = np.maximum(self.high[idx], mid)
+        self.low[idx] = np.minimum(self.low[idx], mid)
+        self.close[idx] = mid
+        self.ticks[idx] += 1
+        self.spread_sum[idx] += spread
+        self.spread_max[idx] = np.maximum(self.spread_max[idx], spread)
+
+    def get_bars(self, timeframe: str) -> Dict[str, np.ndarray]:
+        """Return the stored bars for a timeframe, oldest first"""
+        row = self.names.index(timeframe)
+        n = self.count[row]
+        order = (self.head[row] - np.arange(n)[::-1]) % self.n_bars
+        return {
+            'open': self.open[row, order],
+            'high': self.high[row, order],
+            'low': self.low[row, order],
+            'close': self.close[row, order],
+            'ticks': self.ticks[row, order],
+            'spread_mean': self.spread_sum[row, order] / np.maximum(self.ticks[row, order], 1),
+            'spread_max': self.spread_max[row, order],
+            'start': self.start[row, order]
+        }
+
+    def features(self, lookback: int = 5) -> Dict[str, float]:
+        """Per-timeframe trend, range and spread over the last `lookback` bars"""
+        out = {}
+        for row, name in enumerate(self.names):
+            k = int(min(self.count[row], lookback))
+            if k == 0:
+                out.update({f'trend_{name}': 0.0, f'range_{name}': 0.0,
+                            f'spread_{name}': 0.0, f'ticks_{name}': 0.0})
+                continue
+            cols = (self.head[row] - np.arange(k)) % self.n_bars
+            out[f'trend_{name}'] = self.close[row, cols[0]] - self.open[row, cols[-1]]
+            out[f'range_{name}'] = self.high[row, cols].max() - self.low[row, cols].min()
+            out[f'spread_{name}'] = self.spread_sum[row, cols].sum() / max(self.ticks[row, cols].sum(), 1)
+            out[f'ticks_{name}'] = self.ticks[row, cols].mean()
+        return out
+
 class MarketData:
-    def __init__(self, symbols: List[str], window_size: int = 100):
+    def __init__(self, symbols: List[str], window_size: int = 100, bar_history: int = 60,
+                 volatility_window: int = 20, momentum_window: int = 10):
         self.symbols = symbols
         self.window_size = window_size
+        self.volatility_window = volatility_window
+        self.momentum_window = momentum_window
+        self.min_ticks = max(20, volatility_window, momentum_window + 1)
         self.tick_data = {s: deque(maxlen=window_size) for s in symbols}
+        self.bars = {s: BarBuilder(n_bars=bar_history) for s in symbols}
         self.features = {s: None for s in symbols}
         
     def update(self, tick: Tick) -> Optional[Dict]:
         """Main entry point that triggers feature calculation"""
         self.tick_data[tick.symbol].append(tick)
+        self.bars[tick.symbol].update(tick)
         return self._calculate_features(tick.symbol)
 
     def _calculate_features(self, symbol: str) -> Optional[Dict]:
         """PRIVATE method that actually computes the features"""
         ticks = list(self.tick_data[symbol])
-        if len(ticks) < 20:  # Minimum data points
+        if len(ticks) < self.min_ticks:  # Minimum data points
             return None
 
         bids = np.array([t.bid for t in ticks])
@@ -31,13 +126,19 @@ class MarketData:
         self.features[symbol] = {
             'mid_price': (bids[-1] + asks[-1]) / 2,
             'spread': asks[-1] - bids[-1],
-            'volatility': np.std(bids[-20:]),
-            'momentum': bids[-1] - bids[-10],
+            'volatility': np.std(bids[-self.volatility_window:]),
+            'momentum': bids[-1] - bids[-self.momentum_window],
             'liquidity': len(ticks) / self.window_size,
-            'timestamp': ticks[-1].timestamp
+            'timestamp': ticks[-1].timestamp,
+            **self.bars[symbol].features()
         }
         return self.features[symbol]
 
     def get_features(self, symbol: str) -> Optional[dict]:
         """Public method to access features"""
         return self.features.get(symbol)
+
+    def get_bars(self, symbol: str, timeframe: str) -> Optional[Dict[str, np.ndarray]]:
+        """Public method to access aggregated bars for a timeframe"""
+        builder = self.bars.get(symbol)
+        return builder.get_bars(timeframe) if builder else None
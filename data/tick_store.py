@@ -0,0 +1,45 @@
+import csv
+import numpy as np
+from pathlib import Path
+from typing import Iterable, Iterator, List
+from .models import Tick
+
+# On-disk layout of a recorded tick file (.npy, memory-mappable)
+TICK_DTYPE = np.dtype([
+    ('symbol', 'U10'),
+    ('bid', 'f8'),
+    ('ask', 'f8'),
+    ('timestamp', 'f8')
+])
+
+
+def save_ticks(ticks: Iterable[Tick], path: Path):
+    """Write ticks to a .npy file in timestamp order"""
+    records = np.array([(t.symbol, t.bid, t.ask, t.timestamp) for t in ticks], dtype=TICK_DTYPE)
+    np.save(path, np.sort(records, order='timestamp', kind='stable'))
+
+
+def convert_csv(csv_path: Path, npy_path: Path):
+    """Convert a `symbol,bid,ask,timestamp` CSV recording to the .npy tick format"""
+    with open(csv_path, newline='') as f:
+        ticks = [Tick(row['symbol'], float(row['bid']), float(row['ask']), float(row['timestamp']))
+                 for row in csv.DictReader(f)]
+    save_ticks(ticks, npy_path)
+
+
+def load_ticks(path: Path) -> np.ndarray:
+    """Memory-map a recorded tick file; pages are shared between processes by the OS"""
+    return np.load(path, mmap_mode='r')
+
+
+def iter_ticks(records: np.ndarray, chunk_size: int = 65536) -> Iterator[Tick]:
+    """Yield Tick objects, materialising only one chunk of the mapped file at a time"""
+    for start in range(0, records.shape[0], chunk_size):
+        chunk = records[start:start + chunk_size]
+        for symbol, bid, ask, timestamp in zip(chunk['symbol'].tolist(), chunk['bid'].tolist(),
+                                               chunk['ask'].tolist(), chunk['timestamp'].tolist()):
+            yield Tick(symbol, bid, ask, timestamp)
+
+
+def symbols_in(records: np.ndarray) -> List[str]:
+    return sorted(np.unique(records['symbol']).tolist())
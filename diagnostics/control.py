@@ -0,0 +1,99 @@
+import asyncio
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import threading
+from pathlib import Path
+from typing import Optional
+from config.settings import settings
+from .loop_monitor import LoopLagMonitor, SlowCallbackWatchdog
+from .profiler import SamplingProfiler
+
+logger = logging.getLogger(__name__)
+
+
+class Diagnostics:
+    """Loop-lag sampling, slow-callback reports and an on-demand profiler.
+
+    The profiler can be triggered with `kill -USR1 <pid>` or through the
+    local control socket, e.g. `echo "profile 30" | nc -U logs/diagnostics.sock`.
+    Use the socket when the loop is stuck in a blocking C call, where the
+    signal handler cannot run until the call returns.
+    Socket commands: `lag`, `slow`, `profile [seconds]`.
+    """
+
+    def __init__(self, socket_path: Path = settings.DIAGNOSTICS_SOCKET):
+        self.monitor = LoopLagMonitor()
+        self.watchdog = SlowCallbackWatchdog(self.monitor)
+        self.profiler = SamplingProfiler()
+        self.socket_path = Path(socket_path)
+        self._server: Optional[socketserver.UnixStreamServer] = None
+        self._task: Optional[asyncio.Task] = None
+        self._previous_sigusr1 = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self.monitor.run())
+        self.watchdog.start()
+
+        # Python signal handlers only run between bytecodes on the main
+        # thread: this fires while a coroutine hogs the loop in Python code,
+        # but waits out a blocking C call (a Torch backward pass, a
+        # synchronous broker request). The control socket is served from
+        # its own thread and works in both cases.
+        if hasattr(signal, "SIGUSR1"):
+            self._previous_sigusr1 = signal.signal(signal.SIGUSR1, lambda *_: self.profiler.start())
+
+        if hasattr(socket, "AF_UNIX"):
+            self._start_control_socket()
+        logger.info("Diagnostics started")
+
+    async def stop(self):
+        self.watchdog.stop()
+        if self._task:
+            self._task.cancel()
+        if self._previous_sigusr1 is not None:
+            signal.signal(signal.SIGUSR1, self._previous_sigusr1)
+            self._previous_sigusr1 = None
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self.socket_path.unlink(missing_ok=True)
+            self._server = None
+
+    def handle_command(self, line: str) -> str:
+        parts = line.split()
+        if not parts:
+            return "commands: lag | slow | profile [seconds]"
+        if parts[0] == "lag":
+            return json.dumps(self.monitor.stats())
+        if parts[0] == "slow":
+            return json.dumps({name: {'stalls': count, 'total_ms': round(self.watchdog.stalled_ms[name], 1)}
+                               for name, count in self.watchdog.offenders.most_common()})
+        if parts[0] == "profile":
+            duration = float(parts[1]) if len(parts) > 1 else settings.PROFILE_DURATION
+            if not self.profiler.start(duration):
+                return "profiler already running"
+            return f"profiling for {duration:g}s, output in {self.profiler.output_dir}"
+        return f"unknown command: {parts[0]}"
+
+    def _start_control_socket(self):
+        diagnostics = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                line = self.rfile.readline().decode().strip()
+                try:
+                    reply = diagnostics.handle_command(line)
+                except ValueError as e:
+                    reply = f"error: {e}"
+                self.wfile.write(f"{reply}\n".encode())
+
+        self.socket_path.parent.mkdir(exist_ok=True)
+        self.socket_path.unlink(missing_ok=True)
+        self._server = socketserver.ThreadingUnixStreamServer(str(self.socket_path), Handler)
+        os.chmod(self.socket_path, 0o600)
+        threading.Thread(target=self._server.serve_forever, name="diagnostics-socket",
+                         daemon=True).start()
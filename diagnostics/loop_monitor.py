@@ -0,0 +1,110 @@
+import asyncio
+import inspect
+import logging
+import sys
+import threading
+import time
+import traceback
+import numpy as np
+from collections import Counter
+from typing import Dict, List, Optional
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop runs a callback scheduled `interval` seconds ahead.
+
+    Lags are kept in a fixed-size ring array; the heartbeat timestamp is also
+    what `SlowCallbackWatchdog` uses to detect a stalled loop.
+    """
+
+    def __init__(self, interval: float = settings.LOOP_LAG_INTERVAL, history: int = 1200):
+        self.interval = interval
+        self.lags = np.zeros(history)
+        self.count = 0
+        self.heartbeat = time.monotonic()
+        self.loop_thread_id: Optional[int] = None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - expected, 0.0)
+            self.lags[self.count % self.lags.shape[0]] = lag
+            self.count += 1
+            self.heartbeat = time.monotonic()
+
+    def stats(self) -> Dict[str, float]:
+        """Lag percentiles in milliseconds over the stored history"""
+        lags = self.lags[:min(self.count, self.lags.shape[0])] * 1000
+        if lags.size == 0:
+            return {'samples': 0, 'p50_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+        return {
+            'samples': int(lags.size),
+            'p50_ms': float(np.percentile(lags, 50)),
+            'p99_ms': float(np.percentile(lags, 99)),
+            'max_ms': float(lags.max())
+        }
+
+
+def coroutine_chain(frame) -> List[str]:
+    """Names of the coroutines on a frame's stack, outermost first"""
+    names = []
+    while frame is not None:
+        if frame.f_code.co_flags & inspect.CO_COROUTINE:
+            names.append(frame.f_code.co_name)
+        frame = frame.f_back
+    return names[::-1]
+
+
+class SlowCallbackWatchdog(threading.Thread):
+    """Background thread that reports which coroutine is holding a stalled loop.
+
+    While the loop is healthy it only compares one timestamp per poll, so it
+    can stay enabled in production.
+    """
+
+    def __init__(self, monitor: LoopLagMonitor,
+                 threshold_ms: float = settings.SLOW_CALLBACK_MS, poll: float = 0.02):
+        super().__init__(name="slow-callback-watchdog", daemon=True)
+        self.monitor = monitor
+        self.threshold = threshold_ms / 1000
+        self.poll = poll
+        self.offenders = Counter()   # stalls per culprit coroutine
+        self.stalled_ms = Counter()  # total blocked time per culprit
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        stalled_heartbeat, culprit, location = None, None, None
+        while not self._stop_event.wait(self.poll):
+            heartbeat = self.monitor.heartbeat
+
+            # Loop is back: report the whole stall against the stack seen during it
+            if stalled_heartbeat is not None and heartbeat != stalled_heartbeat:
+                stalled = heartbeat - stalled_heartbeat - self.monitor.interval
+                self.offenders[culprit] += 1
+                self.stalled_ms[culprit] += stalled * 1000
+                logger.warning(f"Event loop was blocked for {stalled * 1000:.0f}ms in {location}")
+                stalled_heartbeat = None
+
+            stalled = time.monotonic() - heartbeat - self.monitor.interval
+            if stalled < self.threshold or heartbeat == stalled_heartbeat:
+                continue
+
+            # Capture the loop thread's stack once per stall, while it is still blocked
+            frame = sys._current_frames().get(self.monitor.loop_thread_id)
+            if frame is None:
+                continue
+            stalled_heartbeat = heartbeat
+            chain = coroutine_chain(frame)
+            culprit = chain[-1] if chain else frame.f_code.co_name
+            stack = "".join(traceback.format_stack(frame, limit=8))
+            location = f"{' -> '.join(chain) or culprit}\n{stack}"
+            logger.debug(f"Event loop blocked for over {stalled * 1000:.0f}ms in {' -> '.join(chain) or culprit}")
@@ -0,0 +1,68 @@
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SamplingProfiler:
+    """Wall-clock sampling profiler over all threads for a fixed window.
+
+    Stacks are written in the collapsed "frame;frame;frame count" format read
+    by flamegraph.pl and speedscope. Nothing runs until `start` is called.
+    """
+
+    def __init__(self, output_dir: Path = settings.LOG_DIR, rate_hz: int = settings.PROFILE_RATE_HZ):
+        self.output_dir = Path(output_dir)
+        self.interval = 1.0 / rate_hz
+        self._thread: Optional[threading.Thread] = None
+        self.last_output: Optional[Path] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration: float = settings.PROFILE_DURATION) -> bool:
+        """Begin sampling in a background thread; returns False if already running"""
+        if self.running:
+            return False
+        self._thread = threading.Thread(target=self._sample, args=(duration,),
+                                        name="sampling-profiler", daemon=True)
+        self._thread.start()
+        logger.info(f"Sampling profiler started for {duration:g}s")
+        return True
+
+    def _sample(self, duration: float):
+        stacks = Counter()
+        own_id = threading.get_ident()
+        names = {}
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            names.update({t.ident: t.name for t in threading.enumerate()})
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+                    frame = frame.f_back
+                frames.append(names.get(thread_id, str(thread_id)))
+                stacks[";".join(reversed(frames))] += 1
+            time.sleep(self.interval)
+        self._write(stacks)
+
+    def _write(self, stacks: Counter):
+        self.output_dir.mkdir(exist_ok=True)
+        path = self.output_dir / f"profile-{time.strftime('%Y%m%d-%H%M%S')}.folded"
+        with open(path, "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        self.last_output = path
+        logger.info(f"Sampling profiler wrote {sum(stacks.values())} samples to {path}")
@@ -1,9 +1,13 @@
 import asyncio
+import time
 from config.settings import settings
 from brokers.oanda import OandaBroker
 from data.market_data import MarketData
 from trading.env import TradingEnv
 from trading.rl.agent import PPODQNAgent
+from trading.risk_management import RISK_OK, RiskEngine
+from trading.shadow import ShadowPool
+from diagnostics.control import Diagnostics
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,6 +17,9 @@ class ScalpingBot:
         self.broker = OandaBroker()  # Initialize broker here
         self.market_data = MarketData(settings.SYMBOLS)
         self.agents = {}
+        self.risk_engine = None
+        self.diagnostics = Diagnostics() if settings.DIAGNOSTICS_ENABLED else None
+        self.shadow = None
         self.running = False
         
     async def initialize(self):
@@ -27,6 +34,11 @@ class ScalpingBot:
             if not accounts:
                 raise ValueError("No valid accounts found")
 
+            # One risk engine shared by every agent on every account
+            self.risk_engine = RiskEngine([a.account_id for a in accounts], settings.SYMBOLS)
+            for account in accounts:
+                await self._sync_account(account)
+
             # Initialize agents
             for account in accounts:
                 for symbol in settings.SYMBOLS:
@@ -34,7 +46,8 @@ class ScalpingBot:
                         symbol=symbol,
                         account=account,
                         broker=self.broker,
-                        market_data=self.market_data
+                        market_data=self.market_data,
+                        risk_engine=self.risk_engine
                     )
 
                     # print(f"observation_space=====", env.observation_space)
@@ -53,6 +66,11 @@ class ScalpingBot:
 
                     self.agents[(account.account_id, symbol)] = PPODQNAgent(env)
             
+            # Candidate policies paper-trade on the same feed, without the broker
+            if settings.SHADOW_POLICIES:
+                self.shadow = ShadowPool.from_checkpoints(settings.SHADOW_POLICIES, settings.SYMBOLS)
+                logger.info(f"Shadow mode: {len(self.shadow.names)} candidate policies")
+            
             logger.info("Initialization completed successfully")
             return True
             
@@ -68,6 +86,9 @@ class ScalpingBot:
             
         self.running = True
         try:
+            if self.diagnostics:
+                await self.diagnostics.start()
+
             # Start market data stream
             stream_task = asyncio.create_task(
                 self.broker.stream_ticks(settings.SYMBOLS, self.on_tick)
@@ -78,6 +99,12 @@ class ScalpingBot:
                 agent.train() for agent in self.agents.values()
             ]
             
+            training_tasks.append(self._refresh_accounts())
+
+            if self.shadow:
+                training_tasks.append(self.shadow.run())
+                training_tasks.append(self.shadow.report_loop())
+            
             await asyncio.gather(stream_task, *training_tasks)
             
         except Exception as e:
@@ -86,26 +113,78 @@ class ScalpingBot:
             self.running = False
             await self.shutdown()
     
+    async def _sync_account(self, account):
+        """Load the broker's open positions and equity for an account into the risk engine"""
+        positions = await self.broker.get_positions(account.account_id)
+        self.risk_engine.update_positions(account.account_id, positions)
+        self.risk_engine.update_account(account)
+
+    async def _refresh_accounts(self):
+        """Periodically re-sync the risk engine with the broker's positions and equity"""
+        while self.running:
+            await asyncio.sleep(settings.ACCOUNT_REFRESH_INTERVAL)
+            for account in await self.broker.get_accounts():
+                await self._sync_account(account)
+
+    def _check_intents(self, symbol: str, decisions: list) -> list:
+        """Risk-check every agent's order intent for this tick in one batch.
+
+        Returns, per decision, whether its order was approved (and reserved),
+        or None when the action places no order.
+        """
+        approvals = [None] * len(decisions)
+        rows, accounts, quantities = [], [], []
+        for i, (agent, decision) in enumerate(decisions):
+            intent = agent.env.order_intent(decision[1])
+            if intent is not None:
+                side, quantity = intent
+                rows.append(i)
+                accounts.append(self.risk_engine.account_index[agent.env.account.account_id])
+                quantities.append(quantity if side == "buy" else -quantity)
+        if rows:
+            codes = self.risk_engine.check_batch(accounts, [self.risk_engine.symbol_index[symbol]] * len(rows),
+                                                 quantities)
+            for i, code in zip(rows, codes):
+                approvals[i] = bool(code == RISK_OK)
+        return approvals
+    
     async def on_tick(self, tick):
         """Process incoming ticks with validation"""
         if not self.running:
             return
             
         try:
+            started = time.perf_counter()
+            self.risk_engine.update_tick(tick)
+
             # Update market data and get features
             if self.market_data.update(tick):
                 features = self.market_data.get_features(tick.symbol)
                 if features:
-                    # Notify relevant agents
+                    # Every agent on this symbol decides first, then their
+                    # orders are risk-checked together before any is placed
+                    decisions = []
                     for (account_id, symbol), agent in self.agents.items():
                         if symbol == tick.symbol:
-                            await agent.process_tick(features)
+                            decision = agent.decide(features)
+                            if decision is not None:
+                                decisions.append((agent, decision))
+                    approvals = self._check_intents(tick.symbol, decisions)
+                    for (agent, decision), approved in zip(decisions, approvals):
+                        await agent.execute(decision, approved)
+
+                    # Shadow policies are evaluated later by their own task,
+                    # once the production orders for this tick are out
+                    if self.shadow:
+                        self.shadow.submit(tick, features, time.perf_counter() - started)
         except Exception as e:
             logger.error(f"Tick processing error: {str(e)}", exc_info=True)
     
     async def shutdown(self):
         """Clean up resources"""
         logger.info("Shutting down...")
+        if self.diagnostics:
+            await self.diagnostics.stop()
         if hasattr(self, 'broker'):
             await self.broker.disconnect()
         self.agents.clear()
@@ -0,0 +1,67 @@
+import asyncio
+import json
+import signal
+import socket
+import time
+import pytest
+from diagnostics.control import Diagnostics
+from diagnostics.loop_monitor import LoopLagMonitor, SlowCallbackWatchdog
+from diagnostics.profiler import SamplingProfiler
+
+
+async def hog(seconds: float):
+    time.sleep(seconds)  # Blocks the loop, as a synchronous call in a tick handler would
+
+
+def test_watchdog_attributes_full_stall_to_blocking_coroutine():
+    monitor = LoopLagMonitor(interval=0.01)
+    watchdog = SlowCallbackWatchdog(monitor, threshold_ms=50, poll=0.005)
+
+    async def run():
+        task = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0.05)
+        watchdog.start()
+        await hog(0.3)
+        await asyncio.sleep(0.1)
+        watchdog.stop()
+        task.cancel()
+
+    asyncio.run(run())
+    assert dict(watchdog.offenders) == {'hog': 1}
+    assert 250 < watchdog.stalled_ms['hog'] < 450
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="control socket needs Unix sockets")
+def test_control_socket_commands_and_profile_output(tmp_path):
+    diagnostics = Diagnostics(socket_path=tmp_path / "diagnostics.sock")
+    diagnostics.profiler = SamplingProfiler(output_dir=tmp_path, rate_hz=200)
+    previous = signal.getsignal(signal.SIGUSR1)
+
+    def ask(command: str) -> str:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(str(diagnostics.socket_path))
+            client.sendall(f"{command}\n".encode())
+            return client.makefile().readline().strip()
+
+    async def run():
+        await diagnostics.start()
+        await asyncio.sleep(0.3)
+        lag = json.loads(ask("lag"))
+        assert lag['samples'] > 0
+        assert ask("profile 0.2").startswith("profiling for 0.2s")
+        assert ask("profile") == "profiler already running"
+        await hog(0.3)
+        diagnostics.profiler._thread.join()
+        assert ask("unknown").startswith("unknown command")
+        await diagnostics.stop()
+
+    asyncio.run(run())
+    assert signal.getsignal(signal.SIGUSR1) is previous
+    assert not diagnostics.socket_path.exists()
+
+    lines = diagnostics.profiler.last_output.read_text().splitlines()
+    assert lines
+    for line in lines:
+        stack, count = line.rsplit(" ", 1)
+        assert stack and int(count) > 0
+    assert any("hog (test_diagnostics.py)" in line for line in lines)
@@ -0,0 +1,40 @@
+import asyncio
+from brokers.simulated import SimulatedBroker
+from data.market_data import MarketData
+from data.models import Account, Tick
+from main import ScalpingBot
+from trading.env import TradingEnv
+from trading.risk_management import RiskEngine
+from trading.rl.agent import PPODQNAgent
+
+
+def test_tick_checks_all_agents_intents_in_one_batch():
+    bot = ScalpingBot()
+    bot.broker = SimulatedBroker()
+    bot.market_data = MarketData(['EUR_USD'])
+    bot.risk_engine = RiskEngine(['A', 'B'], ['EUR_USD'], max_utilization=0.1, max_spread=0.0003)
+    for account_id in ('A', 'B'):
+        account = Account(account_id, 100000, 100000, 100000, 'TEST')
+        bot.risk_engine.update_account(account)
+        env = TradingEnv('EUR_USD', account, bot.broker, bot.market_data, bot.risk_engine)
+        agent = PPODQNAgent(env)
+        agent.act = lambda state: (1, 0.0, 0.0)  # Always buy
+        bot.agents[(account_id, 'EUR_USD')] = agent
+
+    batches = []
+    check_batch = bot.risk_engine.check_batch
+    bot.risk_engine.check_batch = lambda *args, **kwargs: batches.append(args) or check_batch(*args, **kwargs)
+    bot.risk_engine.check_order = None  # The live tick path must not check orders one by one
+
+    async def run():
+        bot.running = True
+        for i in range(bot.market_data.min_ticks):
+            tick = Tick('EUR_USD', 1.1, 1.1001, float(i))
+            bot.broker.on_tick(tick)
+            await bot.on_tick(tick)
+
+    asyncio.run(run())
+    assert len(batches) == 1 and len(batches[0][0]) == 2
+    assert bot.broker.trades == 2
+    assert (bot.risk_engine.position[:, 0] > 0).all()
+    assert (bot.risk_engine.pending == 0).all()
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from data.market_data import TIMEFRAMES, BarBuilder
+from data.models import Tick
+
+
+def make_ticks(n: int = 3000, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    # Irregular arrivals, including gaps that skip whole bars
+    timestamps = 1_700_000_000 + np.cumsum(rng.exponential(0.4, n) + (rng.random(n) < 0.01) * 20)
+    mids = 1.1 + np.cumsum(rng.normal(scale=1e-4, size=n))
+    spreads = rng.uniform(1e-5, 3e-4, n)
+    return [Tick('EUR_USD', m - s / 2, m + s / 2, float(t)) for t, m, s in zip(timestamps, mids, spreads)]
+
+
+def resample(ticks, seconds: int, n_bars: int) -> dict:
+    """Naive OHLC resample of the ticks, keeping the last n_bars bars"""
+    bars = {}
+    for t in ticks:
+        mid, spread = (t.bid + t.ask) / 2, t.ask - t.bid
+        start = np.floor(t.timestamp / seconds) * seconds
+        if start not in bars:
+            bars[start] = {'open': mid, 'high': mid, 'low': mid, 'close': mid, 'ticks': 0, 'spreads': []}
+        bar = bars[start]
+        bar['high'], bar['low'], bar['close'] = max(bar['high'], mid), min(bar['low'], mid), mid
+        bar['ticks'] += 1
+        bar['spreads'].append(spread)
+    starts = sorted(bars)[-n_bars:]
+    return {
+        'start': np.array(starts),
+        **{k: np.array([bars[s][k] for s in starts]) for k in ('open', 'high', 'low', 'close', 'ticks')},
+        'spread_mean': np.array([np.mean(bars[s]['spreads']) for s in starts]),
+        'spread_max': np.array([np.max(bars[s]['spreads']) for s in starts])
+    }
+
+
+@pytest.mark.parametrize("n_ticks", [5, 3000])
+def test_bars_match_naive_resample(n_ticks):
+    ticks = make_ticks(n_ticks)
+    builder = BarBuilder(n_bars=60)
+    for tick in ticks:
+        builder.update(tick)
+
+    for name, seconds in TIMEFRAMES.items():
+        expected = resample(ticks, seconds, builder.n_bars)
+        bars = builder.get_bars(name)
+        assert np.all(np.diff(bars['start']) > 0)  # Oldest first
+        for field, values in expected.items():
+            assert np.allclose(bars[field], values), f"{name} {field}"
+
+
+def test_ring_wraps_after_more_than_n_bars():
+    builder = BarBuilder({'1s': 1}, n_bars=4)
+    for i in range(10):  # One tick per second: ten bars through a four-slot ring
+        builder.update(Tick('EUR_USD', 1.0 + i, 1.0 + i, float(i) + 0.5))
+
+    bars = builder.get_bars('1s')
+    assert bars['start'].tolist() == [6.0, 7.0, 8.0, 9.0]
+    assert bars['close'].tolist() == [7.0, 8.0, 9.0, 10.0]
+    assert builder.count[0] == 4
+
+
+def test_bar_rolls_over_exactly_at_boundary():
+    builder = BarBuilder({'5s': 5}, n_bars=10)
+    for timestamp, mid in [(0.0, 1.0), (4.999, 2.0), (5.0, 3.0), (9.0, 0.5)]:
+        builder.update(Tick('EUR_USD', mid, mid, timestamp))
+
+    bars = builder.get_bars('5s')
+    assert bars['start'].tolist() == [0.0, 5.0]
+    assert bars['open'].tolist() == [1.0, 3.0]
+    assert bars['close'].tolist() == [2.0, 0.5]
+    assert bars['low'].tolist() == [1.0, 0.5]
+    assert bars['ticks'].tolist() == [2, 2]
+
+
+def test_features_use_the_latest_bars():
+    ticks = make_ticks()
+    builder = BarBuilder(n_bars=60)
+    for tick in ticks:
+        builder.update(tick)
+
+    features = builder.features(lookback=5)
+    for name, seconds in TIMEFRAMES.items():
+        last = {k: v[-5:] for k, v in resample(ticks, seconds, 60).items()}
+        assert features[f'trend_{name}'] == pytest.approx(last['close'][-1] - last['open'][0])
+        assert features[f'range_{name}'] == pytest.approx(last['high'].max() - last['low'].min())
+        assert features[f'ticks_{name}'] == pytest.approx(last['ticks'].mean())
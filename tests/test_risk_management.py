@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+from data.models import Account, Order, Position, Tick
+from trading.risk_management import (RISK_INSTRUMENT_LIMIT, RISK_MARGIN, RISK_OK,
+                                     RISK_SPREAD, RiskEngine)
+
+
+@pytest.fixture
+def engine():
+    # Margin budget: 100000 equity * 0.1 = 10000, i.e. 500000 notional at 2% margin
+    engine = RiskEngine(['A', 'B'], ['EUR_USD', 'USD_JPY'], max_utilization=0.1,
+                        max_spread=0.0003, margin_rate=0.02,
+                        max_position_units={'EUR_USD': 400000, 'USD_JPY': 400000})
+    engine.update_account(Account('A', 100000, 100000, 100000, 'TEST'))
+    engine.update_account(Account('B', 100000, 100000, 100000, 'TEST'))
+    engine.update_tick(Tick('EUR_USD', 1.0, 1.0001, 0))
+    engine.update_tick(Tick('USD_JPY', 150.0, 150.01, 0))
+    return engine
+
+
+def fill(engine, account, symbol, side, quantity, price):
+    assert engine.check_order(account, symbol, side, quantity)
+    engine.on_fill(Order('1', symbol, side, price, quantity, account, 0), reserved_quantity=quantity)
+
+
+def test_batch_intents_on_same_cell_net_against_instrument_limit(engine):
+    codes = engine.check_batch([0, 0], [0, 0], [300000, 200000], reserve=False)
+    assert (codes & RISK_INSTRUMENT_LIMIT).all()
+
+    codes = engine.check_batch([0, 0], [0, 0], [300000, -200000], reserve=False)
+    assert (codes == RISK_OK).all()
+
+
+def test_batch_intents_share_account_margin_budget(engine):
+    # Each fits alone, together they exceed account A's budget; B is unaffected
+    codes = engine.check_batch([0, 0, 1], [0, 1, 0], [300000, 300000, 300000], reserve=False)
+    assert codes[0] & RISK_MARGIN and codes[1] & RISK_MARGIN
+    assert codes[2] == RISK_OK
+
+
+def test_single_and_batch_paths_agree(engine):
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        a, s = int(rng.integers(0, 2)), int(rng.integers(0, 2))
+        q = float(rng.normal(0, 300000))
+        batch = engine.check_batch(np.array([a, a]), np.array([s, s]), np.array([q, 0.0]), reserve=False)
+        single = engine.check_batch(np.array([a]), np.array([s]), np.array([q]), reserve=False)
+        assert batch[0] == single[0]
+
+
+def test_spread_filter_only_blocks_increasing_exposure(engine):
+    fill(engine, 'A', 'EUR_USD', 'buy', 100000, 1.0001)
+    engine.update_tick(Tick('EUR_USD', 1.0, 1.001, 1))  # 10 pip spread
+
+    assert not engine.check_order('A', 'EUR_USD', 'buy', 1000)
+    assert engine.rejections['spread'] == 1
+    assert engine.check_order('A', 'EUR_USD', 'sell', 100000)
+    engine.release('A', 'EUR_USD', 'sell', 100000)
+    codes = engine.check_batch([0, 0], [0, 0], [-50000, 50000], reserve=False)
+    assert codes[0] == RISK_OK and codes[1] & RISK_SPREAD
+
+
+def test_reservations_count_until_released_or_filled(engine):
+    assert engine.check_order('A', 'EUR_USD', 'buy', 400000)
+    assert engine.account_pending[0] == pytest.approx(400000 * 1.00005)
+    assert not engine.check_order('A', 'USD_JPY', 'buy', 200000)
+
+    engine.release('A', 'EUR_USD', 'buy', 400000)
+    assert engine.account_pending[0] == pytest.approx(0.0)
+    assert engine.check_order('A', 'USD_JPY', 'buy', 200000)
+
+
+def test_incremental_aggregates_match_full_recompute(engine):
+    rng = np.random.default_rng(1)
+    prices = {'EUR_USD': 1.0, 'USD_JPY': 150.0}
+    for i in range(300):
+        symbol = 'EUR_USD' if i % 2 else 'USD_JPY'
+        prices[symbol] *= 1 + rng.normal(0, 1e-3)
+        tick = Tick(symbol, prices[symbol], prices[symbol] * 1.00001, i)
+        engine.update_tick(tick)
+        account = ['A', 'B'][int(rng.integers(0, 2))]
+        side = 'buy' if rng.random() < 0.5 else 'sell'
+        quantity = float(rng.integers(1, 50000))
+        if engine.check_order(account, symbol, side, quantity):
+            price = tick.ask if side == 'buy' else tick.bid
+            engine.on_fill(Order(str(i), symbol, side, price, quantity, account, i), reserved_quantity=quantity)
+
+    exposure = np.abs(engine.position) * engine.notional_factor
+    unrealized = engine.position * (engine.mid - engine.avg_price) * engine.pnl_factor
+    np.testing.assert_allclose(engine.account_exposure, exposure.sum(axis=1))
+    np.testing.assert_allclose(engine.account_unrealized, unrealized.sum(axis=1), atol=1e-6)
+    np.testing.assert_allclose(engine.account_pending, 0.0, atol=1e-6)
+
+
+def test_equity_follows_realized_and_unrealized_pnl(engine):
+    fill(engine, 'A', 'EUR_USD', 'buy', 100000, 1.0)
+    engine.update_tick(Tick('EUR_USD', 1.01, 1.01, 1))
+    assert engine.equity[0] == pytest.approx(101000)
+
+    fill(engine, 'A', 'EUR_USD', 'sell', 100000, 1.01)
+    assert engine.realized[0] == pytest.approx(1000)
+    assert engine.equity[0] == pytest.approx(101000)
+    assert engine.margin_budget[0] == pytest.approx(10100)
+
+    # A broker snapshot replaces the locally tracked figure
+    engine.update_account(Account('A', 100900, 100900, 100900, 'TEST'))
+    assert engine.equity[0] == pytest.approx(100900)
+
+
+def test_broker_positions_count_toward_margin_and_limits(engine):
+    engine.update_positions('A', [Position('EUR_USD', 350000, 1.0, 1.00005, 'A')])
+    engine.update_account(Account('A', 100000, 100000, 100000, 'TEST'))
+    assert engine.account_exposure[0] == pytest.approx(350000 * 1.00005)
+    assert engine.equity[0] == pytest.approx(100000)
+
+    assert not engine.check_order('A', 'EUR_USD', 'buy', 100000)   # Instrument limit
+    assert not engine.check_order('A', 'USD_JPY', 'buy', 200000)   # Margin already in use
+    assert engine.check_order('A', 'EUR_USD', 'sell', 350000)      # Closing is always allowed
+
+    # A later snapshot without the position flattens it
+    engine.release('A', 'EUR_USD', 'sell', 350000)
+    engine.update_positions('A', [])
+    assert engine.account_exposure[0] == 0
+    assert engine.check_order('A', 'USD_JPY', 'buy', 200000)
@@ -0,0 +1,81 @@
+import asyncio
+import numpy as np
+import pytest
+import torch
+from gymnasium import spaces
+from trading.rl.agent import PPODQNAgent, market_state
+from trading.rl.rollout import discounted_scan
+
+FEATURES = {'mid_price': 1.1, 'spread': 0.0001, 'volatility': 0.0002, 'momentum': 0.0001,
+            'liquidity': 1.0, 'trend_1m': 0.0, 'trend_5m': 0.0}
+
+
+class RecordingEnv:
+    """Minimal TradingEnv stand-in that records when orders go out"""
+
+    def __init__(self, events: list):
+        self.events = events
+        self.observation_space = spaces.Box(-np.inf, np.inf, (len(market_state(FEATURES)) + 2,), np.float32)
+        self.action_space = spaces.Discrete(3)
+        self.position_size = 0
+
+    def _calculate_pnl(self, price: float) -> float:
+        return 0.0
+
+    async def step(self, action: int, approved=None):
+        self.events.append('step')
+        return None, 1.0, False, {}
+
+
+def test_discounted_scan_matches_backward_loop():
+    rng = np.random.default_rng(0)
+    deltas = rng.normal(size=37)
+    discounts = 0.99 * 0.95 * (rng.random(37) > 0.1)  # Episode boundaries zero the discount
+
+    expected = np.zeros_like(deltas)
+    running = 0.0
+    for t in reversed(range(len(deltas))):
+        running = deltas[t] + discounts[t] * running
+        expected[t] = running
+
+    assert np.allclose(discounted_scan(deltas, discounts), expected)
+
+
+def test_batch_size_larger_than_rollout_is_rejected():
+    with pytest.raises(ValueError):
+        PPODQNAgent(RecordingEnv([]), rollout_size=32, batch_size=64)
+
+
+def test_update_runs_in_background_after_the_order():
+    events = []
+    agent = PPODQNAgent(RecordingEnv(events), rollout_size=8, batch_size=4, n_epochs=1)
+    before = [p.clone() for p in agent.policy.parameters()]
+
+    async def run():
+        for _ in range(9):
+            await agent.process_tick(FEATURES)
+        # The rollout filled on the last tick; its order went out before training started
+        assert events == ['step'] * 9
+        assert agent._update_task is not None and not agent._update_task.done()
+        assert len(agent.rollout) == 1
+        await agent._update_task
+
+    asyncio.run(run())
+    assert any(not torch.equal(a, b) for a, b in zip(before, agent.policy.parameters()))
+
+
+def test_sync_updates_train_inline_without_dropping_rollouts():
+    agent = PPODQNAgent(RecordingEnv([]), rollout_size=8, batch_size=4, n_epochs=1, sync_updates=True)
+    updates = []
+    learn = agent._learn
+    agent._learn = lambda rollout, last_value: (updates.append(len(rollout)), learn(rollout, last_value))
+    before = [p.clone() for p in agent.policy.parameters()]
+
+    async def run():
+        for _ in range(17):
+            await agent.process_tick(FEATURES)
+
+    asyncio.run(run())
+    assert agent._update_task is None
+    assert updates == [8, 8]
+    assert any(not torch.equal(a, b) for a, b in zip(before, agent.policy.parameters()))
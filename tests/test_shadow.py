@@ -0,0 +1,83 @@
+import asyncio
+import numpy as np
+import pytest
+import torch
+from brokers.simulated import SimulatedBroker
+from config.settings import settings
+from data.models import Tick
+from trading.rl.actor_critic import ActorCritic
+from trading.shadow import STATE_DIM, ShadowPool
+
+SYMBOLS = ['EUR_USD', 'USD_JPY']
+
+
+def test_ledger_matches_simulated_broker():
+    pool = ShadowPool({'p': ActorCritic(STATE_DIM, 3)}, SYMBOLS, balance=100000.0)
+    broker = SimulatedBroker(balance=100000.0)
+    rng = np.random.default_rng(0)
+    mids = {'EUR_USD': 1.1, 'USD_JPY': 150.0}
+
+    async def run():
+        for i in range(400):
+            symbol = SYMBOLS[rng.integers(2)]
+            s = pool.symbol_index[symbol]
+            mids[symbol] *= 1 + rng.normal(scale=1e-3)
+            half = 5e-5 if symbol == 'EUR_USD' else 5e-3
+            tick = Tick(symbol, mids[symbol] - half, mids[symbol] + half, float(i))
+            pool.bid[s], pool.ask[s] = tick.bid, tick.ask
+            broker.on_tick(tick)
+
+            # Mirror the pool's order rule and sizing onto the broker
+            action = int(rng.integers(3))
+            position, entry = pool.env_position[0, s], pool.env_entry[0, s]
+            if (action == 1 and position <= 0) or (action == 2 and position >= 0):
+                quantity = pool.balance * settings.MAX_ACCOUNT_UTILIZATION / (entry if entry > 0 else 1.0)
+                await broker.place_order(broker.account_id, symbol, "buy" if action == 1 else "sell", quantity)
+            pool._execute(s, np.array([action]))
+
+    asyncio.run(run())
+    for s in range(len(SYMBOLS)):
+        pool._mark(s)
+    assert pool.trades[0] == broker.trades > 0
+    for symbol in SYMBOLS:
+        s = pool.symbol_index[symbol]
+        units, avg_price = broker.positions.get(symbol, [0.0, 0.0])
+        assert pool.units[0, s] == pytest.approx(units)
+        assert pool.avg_price[0, s] == pytest.approx(avg_price)
+    assert pool.balance + pool.realized[0] == pytest.approx(broker.balance)
+    assert pool.equity()[0] == pytest.approx(broker.equity())
+
+
+def test_from_checkpoints_rejects_mismatched_input_dim(tmp_path):
+    good, bad = tmp_path / "good.pt", tmp_path / "bad.pt"
+    torch.save(ActorCritic(STATE_DIM, 3).state_dict(), good)
+    torch.save(ActorCritic(STATE_DIM + 1, 3).state_dict(), bad)
+
+    assert ShadowPool.from_checkpoints([str(good)], SYMBOLS).names == ['good']
+    with pytest.raises(ValueError):
+        ShadowPool.from_checkpoints([str(good), str(bad)], SYMBOLS)
+
+
+def test_policies_must_share_an_architecture():
+    with pytest.raises(ValueError):
+        ShadowPool({'a': ActorCritic(STATE_DIM, 3), 'b': ActorCritic(STATE_DIM, 4)}, SYMBOLS)
+
+
+def test_submitted_ticks_are_evaluated_off_the_caller_latest_first():
+    pool = ShadowPool({'p': ActorCritic(STATE_DIM, 3)}, SYMBOLS)
+    features = {'mid_price': 1.1, 'spread': 0.0001, 'volatility': 0.0002, 'momentum': 0.0001,
+                'liquidity': 1.0, 'trend_1m': 0.0, 'trend_5m': 0.0}
+
+    async def run():
+        for bid in (1.0998, 1.0999, 1.1000):
+            pool.submit(Tick('EUR_USD', bid, bid + 0.0001, 0.0), features, production_latency=0.001)
+        assert pool.ticks == 0  # Nothing is evaluated on the submitting path
+        task = asyncio.create_task(pool.run())
+        while pool.ticks == 0:
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(run())
+    assert pool.ticks == 1 and pool.skipped == 2
+    assert pool.bid[0] == 1.1000
+    assert "whole pool only" in pool.format_report()
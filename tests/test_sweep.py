@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from backtest import sweep
+from config.settings import settings
+from data.models import Tick
+from data.tick_store import save_ticks
+
+
+def test_two_float_lists_are_choices_not_ranges():
+    configs = sweep.random_configs({'max_account_utilization': [0.05, 0.1]}, n=50)
+    assert {c['max_account_utilization'] for c in configs} == {0.05, 0.1}
+
+
+def test_loguniform_samples_within_bounds():
+    configs = sweep.random_configs({'lr': {'loguniform': [1e-5, 1e-3]}}, n=50)
+    lrs = np.array([c['lr'] for c in configs])
+    assert ((lrs >= 1e-5) & (lrs <= 1e-3)).all()
+    assert len(set(lrs)) == 50
+
+    with pytest.raises(ValueError):
+        sweep.random_configs({'lr': {'uniform': [1e-5, 1e-3]}}, n=1)
+
+
+@pytest.fixture
+def ticks_path(tmp_path):
+    rng = np.random.default_rng(0)
+    mids = 1.1 + np.cumsum(rng.normal(scale=1e-4, size=600))
+    path = tmp_path / "ticks.npy"
+    save_ticks([Tick('EUR_USD', m - 5e-5, m + 5e-5, float(i)) for i, m in enumerate(mids)], path)
+    return path
+
+
+def test_runs_do_not_leak_utilization_into_settings(ticks_path):
+    default = settings.MAX_ACCOUNT_UTILIZATION
+    sweep._init_worker(str(ticks_path))
+    record = sweep.run_config({'max_account_utilization': 0.5, 'rollout_size': 16, 'batch_size': 8})
+    assert 'error' not in record
+    assert settings.MAX_ACCOUNT_UTILIZATION == default
+
+
+def test_same_config_reproduces_the_same_result(ticks_path):
+    sweep._init_worker(str(ticks_path))
+    config = {'seed': 1, 'rollout_size': 32, 'batch_size': 8}
+    first, second = sweep.run_config(config), sweep.run_config(config)
+    assert 'error' not in first
+    for field in ('pnl', 'max_drawdown', 'trades', 'ticks'):
+        assert first[field] == second[field]
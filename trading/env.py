@@ -3,21 +3,27 @@ from dataclasses import dataclass
 import gymnasium as gym
 from gymnasium import spaces
 import numpy as np
+from typing import Optional, Tuple
 from data.models import Account
 from brokers.base import IBroker
 from config.settings import settings
 from data.market_data import MarketData
+from trading.risk_management import RiskEngine
 
 logger = logging.getLogger(__name__)
 
 @dataclass
 class TradingEnv(gym.Env):
-    def __init__(self, symbol: str, account: Account, broker: IBroker, market_data: MarketData):
+    def __init__(self, symbol: str, account: Account, broker: IBroker, market_data: MarketData,
+                 risk_engine: Optional[RiskEngine] = None,
+                 max_utilization: float = settings.MAX_ACCOUNT_UTILIZATION):
         super().__init__()
         self.symbol = symbol
         self.account = account
         self.broker = broker
         self.market_data = market_data
+        self.risk_engine = risk_engine
+        self.max_utilization = max_utilization
         
         # Initialize position tracking (consistent naming)
         self.position_size = 0  # Use this name consistently
@@ -30,6 +36,8 @@ class TradingEnv(gym.Env):
             'volatility': spaces.Box(0.0, np.inf, (1,), np.float32),
             'momentum': spaces.Box(-np.inf, np.inf, (1,), np.float32),
             'liquidity': spaces.Box(0.0, 1.0, (1,), np.float32),
+            'trend_1m': spaces.Box(-np.inf, np.inf, (1,), np.float32),
+            'trend_5m': spaces.Box(-np.inf, np.inf, (1,), np.float32),
             'position_size': spaces.Box(-1.0, 1.0, (1,), np.float32),
             'pnl': spaces.Box(-np.inf, np.inf, (1,), np.float32)
         })
@@ -46,7 +54,18 @@ class TradingEnv(gym.Env):
         self.entry_price = 0.0
         return np.zeros(self.observation_space.shape, dtype=np.float32)
     
-    async def step(self, action: int):
+    def order_intent(self, action: int) -> Optional[Tuple[str, float]]:
+        """Side and quantity `step` would order for this action, if any"""
+        if action == 1 and self.position_size <= 0:
+            return "buy", self._calculate_position_size()
+        if action == 2 and self.position_size >= 0:
+            return "sell", self._calculate_position_size()
+        return None
+
+    async def step(self, action: int, approved: Optional[bool] = None):
+        """Act on the market. `approved` carries a risk decision already made
+        (and reserved) for this action's order intent, e.g. by a batch check;
+        when None the order is checked on its own."""
         # Validate action
         if action not in [0, 1, 2]:
             logger.error(f"Invalid action: {action}")
@@ -55,24 +74,14 @@ class TradingEnv(gym.Env):
         # Execute action - use position_size consistently
         if action == 1 and self.position_size <= 0:  # Buy signal
             quantity = self._calculate_position_size()
-            order = await self.broker.place_order(
-                self.account.account_id, 
-                self.symbol, 
-                "buy", 
-                quantity
-            )
+            order = await self._place_order("buy", quantity, approved)
             if order:
                 self.position_size = quantity  # Changed from current_position
                 self.entry_price = order.price
                 
         elif action == 2 and self.position_size >= 0:  # Sell signal
             quantity = self._calculate_position_size()
-            order = await self.broker.place_order(
-                self.account.account_id, 
-                self.symbol, 
-                "sell", 
-                quantity
-            )
+            order = await self._place_order("sell", quantity, approved)
             if order:
                 self.position_size = -quantity  # Changed from current_position
                 self.entry_price = order.price
@@ -83,9 +92,25 @@ class TradingEnv(gym.Env):
         done = False
         return state, reward, done, {}
 
+    async def _place_order(self, side: str, quantity: float, approved: Optional[bool] = None):
+        """Place an order through the shared risk engine, if one is attached"""
+        if self.risk_engine is None:
+            return await self.broker.place_order(self.account.account_id, self.symbol, side, quantity)
+
+        if approved is None:
+            approved = self.risk_engine.check_order(self.account.account_id, self.symbol, side, quantity)
+        if not approved:
+            return None
+        order = await self.broker.place_order(self.account.account_id, self.symbol, side, quantity)
+        if order:
+            self.risk_engine.on_fill(order, reserved_quantity=quantity)
+        else:
+            self.risk_engine.release(self.account.account_id, self.symbol, side, quantity)
+        return order
+
     def _calculate_position_size(self) -> float:
         """Risk-managed position sizing"""
-        max_risk = self.account.margin_available * settings.MAX_ACCOUNT_UTILIZATION
+        max_risk = self.account.margin_available * self.max_utilization
         return max_risk / (self.entry_price if self.entry_price > 0 else 1.0)
     
     def _calculate_reward(self) -> float:
@@ -109,6 +134,8 @@ class TradingEnv(gym.Env):
             'volatility': np.array([features['volatility']], dtype=np.float32),
             'momentum': np.array([features['momentum']], dtype=np.float32),
             'liquidity': np.array([features['liquidity']], dtype=np.float32),
+            'trend_1m': np.array([features['trend_1m']], dtype=np.float32),
+            'trend_5m': np.array([features['trend_5m']], dtype=np.float32),
             'position_size': np.array([self.position_size / settings.DEFAULT_LOT_SIZE], dtype=np.float32),
             'pnl': np.array([self._calculate_pnl(features['mid_price'])], dtype=np.float32)
         }
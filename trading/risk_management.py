@@ -0,0 +1,295 @@
+import logging
+import numpy as np
+from collections import Counter
+from typing import Dict, List, Optional
+from config.settings import settings
+from data.models import Account, Order, Position, Tick
+
+logger = logging.getLogger(__name__)
+
+# Rejection reasons, OR-ed together into the code returned for each intent
+RISK_OK = 0
+RISK_SPREAD = 1
+RISK_INSTRUMENT_LIMIT = 2
+RISK_MARGIN = 4
+RISK_NO_PRICE = 8
+
+REASONS = {RISK_SPREAD: 'spread', RISK_INSTRUMENT_LIMIT: 'instrument_limit',
+           RISK_MARGIN: 'margin', RISK_NO_PRICE: 'no_price'}
+
+
+class RiskEngine:
+    """Pre-trade risk checks shared by every agent trading the same accounts.
+
+    Positions, pending orders, exposure, PnL and margin use are held in NumPy
+    arrays indexed by (account, symbol) with per-account aggregates that
+    ticks, reservations and fills update incrementally. A whole batch of
+    order intents is checked in one vectorized pass; a single intent takes a
+    scalar path that touches only its own (account, symbol) cell.
+    """
+
+    def __init__(self, account_ids: List[str], symbols: List[str],
+                 max_utilization: float = settings.MAX_ACCOUNT_UTILIZATION,
+                 max_spread: float = settings.MAX_SPREAD,
+                 margin_rate: float = settings.MARGIN_RATE,
+                 max_position_units: Optional[Dict[str, float]] = None):
+        self.account_ids = list(account_ids)
+        self.symbols = list(symbols)
+        self.account_index = {a: i for i, a in enumerate(self.account_ids)}
+        self.symbol_index = {s: i for i, s in enumerate(self.symbols)}
+        self.max_utilization = max_utilization
+        self.margin_rate = margin_rate
+
+        n_acc, n_sym = len(self.account_ids), len(self.symbols)
+
+        # Per-symbol market state
+        self.mid = np.zeros(n_sym)
+        self.spread = np.full(n_sym, np.inf)
+        self.notional_factor = np.zeros(n_sym)  # account ccy per unit
+        self.pnl_factor = np.ones(n_sym)        # account ccy per unit of quote ccy
+        self.base_is_account_ccy = np.array(
+            [s.split('_')[0] == settings.ACCOUNT_CURRENCY for s in self.symbols])
+        # MAX_SPREAD is quoted for 4-decimal pairs; JPY pairs have a 100x pip size
+        self.max_spread = np.array(
+            [max_spread * (100 if 'JPY' in s else 1) for s in self.symbols])
+        limits = max_position_units or {}
+        self.max_units = np.array(
+            [limits.get(s, settings.MAX_POSITION_UNITS) for s in self.symbols], dtype=float)
+
+        # Per-(account, symbol) state
+        self.position = np.zeros((n_acc, n_sym))          # filled signed units
+        self.avg_price = np.zeros((n_acc, n_sym))         # average entry of the open position
+        self.pending = np.zeros((n_acc, n_sym))           # approved, not yet filled
+        self.exposure = np.zeros((n_acc, n_sym))          # |position| in account ccy
+        self.pending_exposure = np.zeros((n_acc, n_sym))  # |pending| in account ccy
+        self.unrealized = np.zeros((n_acc, n_sym))        # marked at mid, account ccy
+
+        # Per-account aggregates, kept in sync incrementally
+        self.base_equity = np.zeros(n_acc)  # equity at the last broker snapshot, less open PnL
+        self.realized = np.zeros(n_acc)     # realised since the last snapshot
+        self.account_exposure = np.zeros(n_acc)
+        self.account_pending = np.zeros(n_acc)
+        self.account_unrealized = np.zeros(n_acc)
+
+        self.rejections = Counter()
+
+    @property
+    def equity(self) -> np.ndarray:
+        return self.base_equity + self.realized + self.account_unrealized
+
+    @property
+    def margin_used(self) -> np.ndarray:
+        return self.account_exposure * self.margin_rate
+
+    @property
+    def margin_budget(self) -> np.ndarray:
+        return self.equity * self.max_utilization
+
+    def update_account(self, account: Account):
+        """Re-anchor equity to a broker account snapshot"""
+        a = self.account_index.get(account.account_id)
+        if a is not None:
+            self.base_equity[a] = account.equity - self.account_unrealized[a]
+            self.realized[a] = 0.0
+
+    def update_positions(self, account_id: str, positions: List[Position]):
+        """Replace an account's filled positions with a broker snapshot.
+
+        Covers positions opened before startup or outside the bot. Call it
+        before `update_account` so equity is anchored against the same
+        open PnL.
+        """
+        a = self.account_index.get(account_id)
+        if a is None:
+            return
+        self.position[a] = 0.0
+        self.avg_price[a] = 0.0
+        for p in positions:
+            s = self.symbol_index.get(p.symbol)
+            if s is None:
+                continue
+            self.position[a, s] = p.quantity
+            self.avg_price[a, s] = p.entry_price
+            if self.mid[s] == 0 and p.current_price > 0:
+                # No tick yet: mark at the broker's price until one arrives
+                self.mid[s] = p.current_price
+                self.notional_factor[s] = 1.0 if self.base_is_account_ccy[s] else p.current_price
+                self.pnl_factor[s] = 1.0 / p.current_price if self.base_is_account_ccy[s] else 1.0
+
+        self.exposure[a] = np.abs(self.position[a]) * self.notional_factor
+        self.account_exposure[a] = self.exposure[a].sum()
+        self.unrealized[a] = self.position[a] * (self.mid - self.avg_price[a]) * self.pnl_factor
+        self.account_unrealized[a] = self.unrealized[a].sum()
+
+    def update_tick(self, tick: Tick):
+        """Track spread and re-mark the symbol's exposure and PnL columns"""
+        s = self.symbol_index.get(tick.symbol)
+        if s is None:
+            return
+        mid = (tick.bid + tick.ask) / 2
+        self.mid[s] = mid
+        self.spread[s] = tick.ask - tick.bid
+        self.notional_factor[s] = 1.0 if self.base_is_account_ccy[s] else mid
+        self.pnl_factor[s] = 1.0 / mid if self.base_is_account_ccy[s] else 1.0
+
+        position = self.position[:, s]
+        column = np.abs(position) * self.notional_factor[s]
+        self.account_exposure += column - self.exposure[:, s]
+        self.exposure[:, s] = column
+
+        column = np.abs(self.pending[:, s]) * self.notional_factor[s]
+        self.account_pending += column - self.pending_exposure[:, s]
+        self.pending_exposure[:, s] = column
+
+        column = position * (mid - self.avg_price[:, s]) * self.pnl_factor[s]
+        self.account_unrealized += column - self.unrealized[:, s]
+        self.unrealized[:, s] = column
+
+    def _add_pending(self, a: int, s: int, signed: float):
+        self.pending[a, s] += signed
+        new = abs(self.pending[a, s]) * self.notional_factor[s]
+        self.account_pending[a] += new - self.pending_exposure[a, s]
+        self.pending_exposure[a, s] = new
+
+    def _count(self, codes: np.ndarray):
+        for bit, name in REASONS.items():
+            n = int(np.count_nonzero(codes & bit))
+            if n:
+                self.rejections[name] += n
+
+    def _check_one(self, a: int, s: int, signed: float) -> int:
+        """Scalar version of `check_batch` for a single intent"""
+        factor = self.notional_factor[s]
+        if factor <= 0:
+            return RISK_NO_PRICE
+
+        code = RISK_OK
+        current = self.position[a, s] + self.pending[a, s]
+        if abs(current + signed) > self.max_units[s]:
+            code |= RISK_INSTRUMENT_LIMIT
+
+        added = (abs(current + signed) - abs(current)) * factor
+        if added > 0:
+            if self.spread[s] > self.max_spread[s]:
+                code |= RISK_SPREAD
+            margin_after = (self.account_exposure[a] + self.account_pending[a] + added) * self.margin_rate
+            if margin_after > self.margin_budget[a]:
+                code |= RISK_MARGIN
+        return code
+
+    def check_batch(self, account_idx: np.ndarray, symbol_idx: np.ndarray,
+                    quantity: np.ndarray, reserve: bool = True) -> np.ndarray:
+        """Check signed order intents in one pass and return a reason code per intent.
+
+        Intents that increase exposure on the same account are checked
+        against the margin budget together, so agents sharing an account
+        cannot jointly exceed it. The spread filter only applies to intents
+        that increase exposure, so positions can always be reduced. Approved
+        intents are reserved as pending until `on_fill` or `release`.
+        """
+        account_idx = np.asarray(account_idx, dtype=np.intp)
+        symbol_idx = np.asarray(symbol_idx, dtype=np.intp)
+        quantity = np.asarray(quantity, dtype=float)
+
+        if quantity.shape[0] == 1:
+            a, s, q = int(account_idx[0]), int(symbol_idx[0]), float(quantity[0])
+            codes = np.array([self._check_one(a, s, q)], dtype=np.uint8)
+            if reserve and codes[0] == RISK_OK:
+                self._add_pending(a, s, q)
+            self._count(codes)
+            return codes
+
+        codes = np.zeros(quantity.shape[0], dtype=np.uint8)
+        factor = self.notional_factor[symbol_idx]
+        codes[factor <= 0] |= RISK_NO_PRICE
+
+        # Intents against the same (account, symbol) net with each other
+        flat = account_idx * len(self.symbols) + symbol_idx
+        cells, cell_of = np.unique(flat, return_inverse=True)
+        net = np.bincount(cell_of, weights=quantity)
+        current = self.position[account_idx, symbol_idx] + self.pending[account_idx, symbol_idx]
+        codes[np.abs(current + net[cell_of]) > self.max_units[symbol_idx]] |= RISK_INSTRUMENT_LIMIT
+
+        # Exposure-increasing intents must clear the spread filter and share
+        # the account's remaining margin, measured on the netted change per cell
+        increasing = np.abs(current + quantity) > np.abs(current)
+        codes[increasing & (self.spread[symbol_idx] > self.max_spread[symbol_idx])] |= RISK_SPREAD
+        cell_a, cell_s = np.divmod(cells, len(self.symbols))
+        cell_current = self.position[cell_a, cell_s] + self.pending[cell_a, cell_s]
+        cell_added = (np.abs(cell_current + net) - np.abs(cell_current)) * self.notional_factor[cell_s]
+        requested = np.bincount(cell_a, weights=np.maximum(cell_added, 0.0),
+                                minlength=len(self.account_ids))
+        margin_after = (self.account_exposure + self.account_pending + requested) * self.margin_rate
+        over = margin_after > self.margin_budget
+        codes[increasing & over[account_idx]] |= RISK_MARGIN
+
+        if reserve:
+            ok = codes == RISK_OK
+            np.add.at(self.pending, (account_idx[ok], symbol_idx[ok]), quantity[ok])
+            touched = np.unique(flat[ok])
+            a, s = np.divmod(touched, len(self.symbols))
+            new = np.abs(self.pending[a, s]) * self.notional_factor[s]
+            np.add.at(self.account_pending, a, new - self.pending_exposure[a, s])
+            self.pending_exposure[a, s] = new
+        self._count(codes)
+        return codes
+
+    def check_order(self, account_id: str, symbol: str, side: str, quantity: float) -> bool:
+        """Check and reserve a single order intent"""
+        a = self.account_index.get(account_id)
+        s = self.symbol_index.get(symbol)
+        if a is None or s is None:
+            logger.warning(f"Risk check for unknown account/symbol: {account_id}/{symbol}")
+            return False
+
+        signed = quantity if side == "buy" else -quantity
+        code = self._check_one(a, s, signed)
+        if code != RISK_OK:
+            for bit, name in REASONS.items():
+                if code & bit:
+                    self.rejections[name] += 1
+            logger.debug(f"Risk rejected {side} {quantity} {symbol} on {account_id} (code={code})")
+            return False
+        self._add_pending(a, s, signed)
+        return True
+
+    def release(self, account_id: str, symbol: str, side: str, quantity: float):
+        """Drop a reservation for an order that was approved but never filled"""
+        a, s = self.account_index[account_id], self.symbol_index[symbol]
+        self._add_pending(a, s, -quantity if side == "buy" else quantity)
+
+    def on_fill(self, order: Order, reserved_quantity: Optional[float] = None):
+        """Move a filled order from pending into the position, PnL and exposure aggregates"""
+        a = self.account_index.get(order.account_id)
+        s = self.symbol_index.get(order.symbol)
+        if a is None or s is None:
+            return
+
+        sign = 1.0 if order.side == "buy" else -1.0
+        reserved = order.quantity if reserved_quantity is None else reserved_quantity
+        self._add_pending(a, s, -sign * reserved)
+
+        # Net the fill, realising PnL on any closed portion
+        signed = sign * order.quantity
+        units, avg = self.position[a, s], self.avg_price[a, s]
+        new_units = units + signed
+        if units == 0 or (units > 0) == (signed > 0):
+            self.avg_price[a, s] = (units * avg + signed * order.price) / new_units
+        else:
+            closed = min(abs(units), abs(signed)) * (1.0 if units > 0 else -1.0)
+            self.realized[a] += closed * (order.price - avg) * self.pnl_factor[s]
+            if new_units == 0:
+                self.avg_price[a, s] = 0.0
+            elif (new_units > 0) != (units > 0):
+                self.avg_price[a, s] = order.price  # Flipped through flat
+        self.position[a, s] = new_units
+
+        factor = self.notional_factor[s] or (1.0 if self.base_is_account_ccy[s] else order.price)
+        new_exposure = abs(new_units) * factor
+        self.account_exposure[a] += new_exposure - self.exposure[a, s]
+        self.exposure[a, s] = new_exposure
+
+        mark = self.mid[s] or order.price
+        new_unrealized = new_units * (mark - self.avg_price[a, s]) * self.pnl_factor[s]
+        self.account_unrealized[a] += new_unrealized - self.unrealized[a, s]
+        self.unrealized[a, s] = new_unrealized
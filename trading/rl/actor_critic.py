@@ -5,6 +5,7 @@ from ..rl.utils import check_for_nans
 class ActorCritic(nn.Module):
     def __init__(self, input_dim, action_dim):
         super().__init__()
+        self.action_dim = action_dim
         self.shared = nn.Sequential(
             nn.Linear(input_dim, 128),
             nn.ReLU(),
@@ -19,15 +20,15 @@ class ActorCritic(nn.Module):
     def forward(self, x):
         if check_for_nans(x, "network input"):
             # Return uniform probabilities and zero value if input is invalid
-            actions = torch.ones(x.shape[0], self.action_dim) / self.action_dim
-            value = torch.zeros(x.shape[0], 1)
+            actions = torch.ones(*x.shape[:-1], self.action_dim) / self.action_dim
+            value = torch.zeros(*x.shape[:-1], 1)
             return actions, value
 
         features = self.shared(x)
         
         if check_for_nans(features, "shared features"):
-            actions = torch.ones(x.shape[0], self.action_dim) / self.action_dim
-            value = torch.zeros(x.shape[0], 1)
+            actions = torch.ones(*x.shape[:-1], self.action_dim) / self.action_dim
+            value = torch.zeros(*x.shape[:-1], 1)
             return actions, value
  
         action_probs = self.actor(features)
@@ -1,20 +1,41 @@
+import asyncio
+import copy
 import logging
 import torch
 import torch.optim as optim
 import numpy as np
-from collections import deque
-import random
 import gymnasium as gym
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 from gymnasium import spaces
 from trading.rl.actor_critic import ActorCritic
+from trading.rl.rollout import RolloutStorage
 from .utils import check_for_nans
 from config.settings import settings
 from trading.env import TradingEnv
 
 logger = logging.getLogger(__name__)
 
+# PPO updates run here, one at a time across all agents, so training never
+# blocks the event loop and concurrent updates don't oversubscribe the CPU
+_update_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ppo-update")
+
+def market_state(features: dict) -> list:
+    """Position-independent part of the state vector, scaled to pips"""
+    return [
+        features['mid_price'],
+        features['spread'] * 10000,  # Convert to pips
+        features['volatility'] * 10000,
+        features['momentum'] * 10000,
+        features['liquidity'],
+        features['trend_1m'] * 10000,
+        features['trend_5m'] * 10000
+    ]
+
 class PPODQNAgent:
-    def __init__(self, env: TradingEnv, lr=1e-4, gamma=0.99, clip_epsilon=0.2):
+    def __init__(self, env: TradingEnv, lr=1e-4, gamma=0.99, clip_epsilon=0.2,
+                 gae_lambda=0.95, rollout_size=512, n_epochs=4, batch_size=64,
+                 value_coef=0.5, entropy_coef=0.01, sync_updates=False):
         self.env = env
         
         # Debug checks
@@ -36,19 +57,29 @@ class PPODQNAgent:
         # Rest of initialization
         self.gamma = gamma
         self.clip_epsilon = clip_epsilon
-        self.buffer = deque(maxlen=10000)
-        self.policy = ActorCritic(self.input_dim, env.action_space.n)
-        self.optimizer = optim.Adam(self.policy.parameters(), lr=lr)
+        self.gae_lambda = gae_lambda
+        self.n_epochs = n_epochs
+        self.batch_size = batch_size
+        self.value_coef = value_coef
+        self.entropy_coef = entropy_coef
+        if batch_size > rollout_size:
+            raise ValueError(f"batch_size ({batch_size}) must not exceed rollout_size ({rollout_size})")
+        self.rollout = RolloutStorage(rollout_size, self.input_dim)
+
+        # Updates train a separate learner network off the event loop; the
+        # acting policy picks up its weights once an update completes. With
+        # sync_updates (backtests) each update runs inline before the next
+        # tick and no rollout is dropped, so replays are reproducible.
+        self.sync_updates = sync_updates
+        self.learner = copy.deepcopy(self.policy)
+        self.optimizer = optim.Adam(self.learner.parameters(), lr=lr)
+        self._update_task = None
         self.eps = 1e-8
         
     def _features_to_state(self, features: dict) -> torch.Tensor:
         """Convert market features to normalized state tensor"""
         state = np.array([
-            features['mid_price'],
-            features['spread'] * 10000,  # Convert to pips
-            features['volatility'] * 10000,
-            features['momentum'] * 10000,
-            features['liquidity'],
+            *market_state(features),
             self.env.position_size / settings.DEFAULT_LOT_SIZE,
             self.env._calculate_pnl(features['mid_price'])
         ], dtype=np.float32)
@@ -61,40 +92,81 @@ class PPODQNAgent:
         
         return torch.FloatTensor(state)
 
+    def save_checkpoint(self, path: str):
+        """Save policy weights, e.g. for evaluation in a ShadowPool"""
+        torch.save(self.policy.state_dict(), path)
+
+    def _distribution(self, probs: torch.Tensor) -> torch.distributions.Categorical:
+        probs = torch.clamp(probs, min=self.eps, max=1.0-self.eps)
+        return torch.distributions.Categorical(probs / probs.sum(dim=-1, keepdim=True))
+
+    def act(self, state: torch.Tensor):
+        """Sample an action and return it with its log-probability and value estimate"""
+        with torch.no_grad():
+            probs, value = self.policy(state)
+            if check_for_nans(probs, "action probabilities") or check_for_nans(value, "state value"):
+                return None
+            dist = self._distribution(probs)
+            action = dist.sample()
+            return action.item(), dist.log_prob(action).item(), value.item()
+
     async def process_tick(self, features: dict):
         """Handle new market data and take trading action"""
+        decision = self.decide(features)
+        if decision is not None:
+            await self.execute(decision)
+
+    def decide(self, features: dict) -> Optional[tuple]:
+        """Sample this tick's action; returns (state, action, log_prob, value) or None"""
         try:
             # Convert to state vector
             state = self._features_to_state(features)
             
             if check_for_nans(state, "state vector"):
                 logger.warning("Invalid state detected, skipping tick")
-                return
+                return None
                 
             # Get action from policy
-            with torch.no_grad():
-                probs, _ = self.policy(state)
-                if check_for_nans(probs, "action probabilities"):
-                    return
-                    
-                probs = torch.clamp(probs, min=self.eps, max=1.0-self.eps)
-                probs = probs / probs.sum()
-                
-                dist = torch.distributions.Categorical(probs)
-                action = dist.sample().item()
-            
+            sample = self.act(state)
+            if sample is None:
+                return None
+            return (state, *sample)
+        except Exception as e:
+            logger.error(f"Error processing tick: {str(e)}", exc_info=True)
+            return None
+
+    async def execute(self, decision: tuple, approved: Optional[bool] = None):
+        """Act on a decision from `decide` and record the transition.
+
+        `approved` is the risk decision for the action's order intent when
+        the caller has already checked it, see TradingEnv.step.
+        """
+        try:
+            state, action, log_prob, value = decision
+
             # Execute action
-            _, reward, done, _ = await self.env.step(action)
+            _, reward, done, _ = await self.env.step(action, approved)
+
+            # Rollout is complete once we know the value of the state that
+            # follows it; train on it in the background after the order is out
+            if self.rollout.full:
+                rollout = self._take_rollout()
+                if self.sync_updates:
+                    await self._update_policy(value, rollout)
+                elif self._update_task is None or self._update_task.done():
+                    self._update_task = asyncio.create_task(self._update_policy(value, rollout))
+                else:
+                    logger.debug("Previous policy update still running, dropping rollout")
             
             # Store experience
             if not check_for_nans(torch.FloatTensor([reward]), "reward"):
-                self.buffer.append((state.numpy(), action, reward, None, done))
+                self.rollout.add(state.numpy(), action, log_prob, value, reward, done)
             
         except Exception as e:
             logger.error(f"Error processing tick: {str(e)}", exc_info=True)
     
-    async def train(self, n_episodes=1000, batch_size=64):
-        """Training loop with experience replay"""
+    async def train(self, n_episodes=1000):
+        """On-policy training loop collecting fixed-size rollouts"""
         for episode in range(n_episodes):
             state = await self.env.reset()
             episode_reward = 0
@@ -102,29 +174,27 @@ class PPODQNAgent:
             while True:
                 # Process current state
                 state_tensor = torch.FloatTensor(state)
-                probs, value = self.policy(state_tensor)
-
-                if check_for_nans(probs, "action probabilities") or check_for_nans(value, "state value"):
+                sample = self.act(state_tensor)
+                if sample is None:
                     state = await self.env.reset()
                     continue
-                
-                # Select action
-                probs = torch.clamp(probs, min=self.eps, max=1.0-self.eps)
-                probs = probs / probs.sum()
-                dist = torch.distributions.Categorical(probs)
-                action = dist.sample().item()
+                action, log_prob, value = sample
                 
                 # Take action
                 next_state, reward, done, _ = await self.env.step(action)
 
                 # Store experience
                 if not check_for_nans(torch.FloatTensor([reward]), "reward"):
-                    self.buffer.append((state, action, reward, next_state, done))
+                    self.rollout.add(state, action, log_prob, value, reward, done)
                 episode_reward += reward
                 
-                # Train on batch
-                if len(self.buffer) >= batch_size:
-                    await self._update_policy(batch_size)
+                # Train on the completed rollout
+                if self.rollout.full:
+                    last_value = 0.0
+                    if not done:
+                        with torch.no_grad():
+                            last_value = self.policy(torch.FloatTensor(next_state))[1].item()
+                    await self._update_policy(last_value)
                 
                 if done:
                     logger.info(f"Episode {episode} reward: {episode_reward:.2f}")
@@ -132,52 +202,54 @@ class PPODQNAgent:
                     
                 state = next_state
     
-    async def _update_policy(self, batch_size):
-        """PPO policy update with experience replay"""
-        if len(self.buffer) < batch_size:
-            return
-            
-        batch = random.sample(self.buffer, batch_size)
-        states, actions, rewards, next_states, dones = zip(*batch)
-        
-        # Convert to tensors
-        states = torch.FloatTensor(np.array(states))
-        actions = torch.LongTensor(actions)
-        rewards = torch.FloatTensor(rewards)
-        next_states = torch.FloatTensor(np.array(next_states))
-        dones = torch.FloatTensor(dones)
-        
-        # Validate inputs
-        if (check_for_nans(states, "states") or 
-            check_for_nans(actions, "actions") or
-            check_for_nans(rewards, "rewards")):
+    def _take_rollout(self) -> RolloutStorage:
+        """Hand off the current rollout and start collecting into a fresh one"""
+        rollout = self.rollout
+        self.rollout = RolloutStorage(rollout.size, self.input_dim)
+        return rollout
+
+    async def _update_policy(self, last_value: float = 0.0, rollout: Optional[RolloutStorage] = None):
+        """Train on a rollout, then load the new weights into the acting policy"""
+        if rollout is None:
+            rollout = self._take_rollout()
+        if len(rollout) < self.batch_size:
             return
-        
-        # Calculate advantages
-        with torch.no_grad():
-            _, next_values = self.policy(next_states)
-            target_values = rewards + (1 - dones) * self.gamma * next_values.squeeze()
-            _, current_values = self.policy(states)
-            advantages = target_values - current_values.squeeze()
-        
-        # PPO policy loss
-        new_probs, _ = self.policy(states)
-        new_probs = new_probs.gather(1, actions.unsqueeze(1))
-        old_probs = new_probs.detach()
-        
-        ratio = new_probs / old_probs
-        clipped_ratio = torch.clamp(ratio, 1-self.clip_epsilon, 1+self.clip_epsilon)
-        policy_loss = -torch.min(ratio * advantages.unsqueeze(1),
-                               clipped_ratio * advantages.unsqueeze(1)).mean()
-        
-        # Value loss
-        value_loss = (current_values.squeeze() - target_values).pow(2).mean()
-        
-        # Total loss
-        loss = policy_loss + 0.5 * value_loss
-        
-        # Optimize
-        self.optimizer.zero_grad()
-        loss.backward()
-        torch.nn.utils.clip_grad_norm_(self.policy.parameters(), max_norm=1.0)
-        self.optimizer.step()
\ No newline at end of file
+
+        try:
+            if self.sync_updates:
+                self._learn(rollout, last_value)
+            else:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(_update_executor, self._learn, rollout, last_value)
+            self.policy.load_state_dict(self.learner.state_dict())
+        except Exception as e:
+            logger.error(f"Policy update failed: {str(e)}", exc_info=True)
+
+    def _learn(self, rollout: RolloutStorage, last_value: float):
+        """PPO update: GAE over the rollout, then several epochs of clipped minibatch steps"""
+        rollout.compute_returns_and_advantages(last_value, self.gamma, self.gae_lambda)
+
+        for _ in range(self.n_epochs):
+            for states, actions, old_log_probs, returns, advantages in rollout.minibatches(self.batch_size):
+                probs, values = self.learner(states)
+                if check_for_nans(probs, "action probabilities"):
+                    continue
+                dist = self._distribution(probs)
+                log_probs = dist.log_prob(actions)
+
+                # PPO policy loss against the behaviour policy
+                ratio = torch.exp(log_probs - old_log_probs)
+                clipped_ratio = torch.clamp(ratio, 1-self.clip_epsilon, 1+self.clip_epsilon)
+                policy_loss = -torch.min(ratio * advantages, clipped_ratio * advantages).mean()
+
+                # Value loss
+                value_loss = (values.squeeze(-1) - returns).pow(2).mean()
+
+                # Total loss
+                loss = policy_loss + self.value_coef * value_loss - self.entropy_coef * dist.entropy().mean()
+
+                # Optimize
+                self.optimizer.zero_grad()
+                loss.backward()
+                torch.nn.utils.clip_grad_norm_(self.learner.parameters(), max_norm=1.0)
+                self.optimizer.step()
@@ -0,0 +1,88 @@
+import numpy as np
+import torch
+from typing import Iterator, Tuple
+
+
+def discounted_scan(deltas: np.ndarray, discounts: np.ndarray) -> np.ndarray:
+    """Solve A[t] = deltas[t] + discounts[t] * A[t+1] (with A[n] = 0) for all t.
+
+    Uses a log-depth parallel suffix scan, so the whole rollout is processed
+    in O(log n) vectorized NumPy operations instead of a Python loop.
+    """
+    acc = deltas.astype(np.float64, copy=True)
+    coef = discounts.astype(np.float64, copy=True)
+    offset = 1
+    while offset < acc.shape[0]:
+        acc[:-offset] = acc[:-offset] + coef[:-offset] * acc[offset:]
+        coef[:-offset] = coef[:-offset] * coef[offset:]
+        coef[-offset:] = 0.0
+        offset *= 2
+    return acc
+
+
+class RolloutStorage:
+    """Fixed-size on-policy storage for PPO.
+
+    Transitions are written into preallocated arrays together with the
+    log-probability and value recorded when the action was taken, so the
+    update can compute the true PPO ratio against the behaviour policy.
+    """
+
+    def __init__(self, size: int, state_dim: int):
+        self.size = size
+        self.states = np.zeros((size, state_dim), dtype=np.float32)
+        self.actions = np.zeros(size, dtype=np.int64)
+        self.log_probs = np.zeros(size, dtype=np.float32)
+        self.values = np.zeros(size, dtype=np.float32)
+        self.rewards = np.zeros(size, dtype=np.float32)
+        self.dones = np.zeros(size, dtype=np.float32)
+        self.returns = np.zeros(size, dtype=np.float32)
+        self.advantages = np.zeros(size, dtype=np.float32)
+        self.ptr = 0
+
+    def __len__(self) -> int:
+        return self.ptr
+
+    @property
+    def full(self) -> bool:
+        return self.ptr >= self.size
+
+    def add(self, state, action: int, log_prob: float, value: float, reward: float, done: bool):
+        i = self.ptr
+        self.states[i] = state
+        self.actions[i] = action
+        self.log_probs[i] = log_prob
+        self.values[i] = value
+        self.rewards[i] = reward
+        self.dones[i] = float(done)
+        self.ptr += 1
+
+    def compute_returns_and_advantages(self, last_value: float, gamma: float, gae_lambda: float):
+        """Vectorized GAE over the stored rollout"""
+        n = self.ptr
+        values = self.values[:n].astype(np.float64)
+        not_done = 1.0 - self.dones[:n].astype(np.float64)
+        next_values = np.append(values[1:], last_value)
+
+        deltas = self.rewards[:n] + gamma * next_values * not_done - values
+        advantages = discounted_scan(deltas, gamma * gae_lambda * not_done)
+
+        self.advantages[:n] = advantages
+        self.returns[:n] = advantages + values
+
+    def minibatches(self, batch_size: int) -> Iterator[Tuple[torch.Tensor, ...]]:
+        """Yield shuffled minibatches of (states, actions, old_log_probs, returns, advantages)"""
+        n = self.ptr
+        adv = self.advantages[:n]
+        adv = (adv - adv.mean()) / (adv.std() + 1e-8)
+
+        states = torch.from_numpy(self.states[:n])
+        actions = torch.from_numpy(self.actions[:n])
+        log_probs = torch.from_numpy(self.log_probs[:n])
+        returns = torch.from_numpy(self.returns[:n])
+        advantages = torch.from_numpy(adv.astype(np.float32))
+
+        indices = torch.randperm(n)
+        for start in range(0, n, batch_size):
+            idx = indices[start:start + batch_size]
+            yield states[idx], actions[idx], log_probs[idx], returns[idx], advantages[idx]
@@ -0,0 +1,284 @@
+import asyncio
+import logging
+import time
+import numpy as np
+import torch
+import torch.nn as nn
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+from torch.func import stack_module_state
+from config.settings import settings
+from data.models import Tick
+from trading.rl.actor_critic import ActorCritic
+from trading.rl.agent import market_state
+from trading.rl.utils import check_for_nans
+
+logger = logging.getLogger(__name__)
+
+# Shadow evaluation runs here; the batched matmuls release the GIL, so the
+# event loop keeps handling production ticks while the pool is evaluated
+_shadow_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+
+# Market features plus the policy's own position and PnL, as built in on_tick
+STATE_DIM = len(market_state(defaultdict(float))) + 2
+
+
+class ShadowPool:
+    """Paper-trades candidate policies on the live tick feed.
+
+    All policies are evaluated in one batched forward pass (their weights are
+    stacked and each layer is a single batched matmul), and every policy fills
+    against the current bid/ask in a vectorized in-process ledger: one row per
+    policy, one column per symbol. No broker calls are made.
+
+    Orders follow TradingEnv.step: a buy signal opens a position unless the
+    policy is already long, a sell signal unless it is already short, and
+    orders are sized like TradingEnv._calculate_position_size.
+
+    Evaluation is kept off the order path: the bot only `submit`s each tick,
+    and `run` evaluates the latest tick per symbol in a worker thread. Ticks
+    that arrive while a symbol is still queued replace the queued one and
+    are counted as skipped.
+    """
+
+    def __init__(self, policies: Dict[str, ActorCritic], symbols: List[str],
+                 balance: float = settings.SHADOW_BALANCE):
+        if not policies:
+            raise ValueError("ShadowPool needs at least one policy")
+        self.names = list(policies)
+        self.symbols = list(symbols)
+        self.symbol_index = {s: i for i, s in enumerate(self.symbols)}
+        models = [policies[n].eval() for n in self.names]
+        self.action_dim = models[0].action_dim
+
+        # Stacking needs every policy to share one architecture
+        shapes = {k: v.shape for k, v in models[0].state_dict().items()}
+        for name, model in zip(self.names, models):
+            if {k: v.shape for k, v in model.state_dict().items()} != shapes:
+                raise ValueError(f"Policy {name} has a different architecture from {self.names[0]}")
+
+        # Stacked weights: one (n_policies, in, out) tensor per Linear layer,
+        # stored contiguously in the layout the batched matmul reads
+        params, _ = stack_module_state(models)
+        self.params = {k: v.detach().transpose(1, 2).contiguous() if k.endswith('.weight')
+                       else v.detach().unsqueeze(1)
+                       for k, v in params.items()}
+        self._shared = list(models[0].shared.named_children())
+        self._actor = list(models[0].actor.named_children())
+
+        n_pol, n_sym = len(self.names), len(self.symbols)
+        self.balance = balance
+        self._order_notional = balance * settings.MAX_ACCOUNT_UTILIZATION
+        self.bid = np.zeros(n_sym)
+        self.ask = np.zeros(n_sym)
+        self.base_is_account_ccy = np.array([s.split('_')[0] == settings.ACCOUNT_CURRENCY for s in self.symbols])
+        self.quote_is_account_ccy = np.array([s.split('_')[1] == settings.ACCOUNT_CURRENCY for s in self.symbols])
+        self.precision = np.array([settings.INSTRUMENT_PRECISION.get(s, 2) for s in self.symbols])
+
+        # Ledger: net units and average price as the broker would see them,
+        # with open PnL in account currency re-marked one column per tick
+        self.units = np.zeros((n_pol, n_sym))
+        self.avg_price = np.zeros((n_pol, n_sym))
+        self.unrealized = np.zeros((n_pol, n_sym))
+        self.realized = np.zeros(n_pol)
+        self.trades = np.zeros(n_pol, dtype=np.int64)
+        self.peak_equity = np.full(n_pol, balance)
+        self.max_drawdown = np.zeros(n_pol)
+
+        # The env's own view of the position, which feeds back into the state
+        self.env_position = np.zeros((n_pol, n_sym))
+        self.env_entry = np.zeros((n_pol, n_sym))
+
+        # Reused input buffer; the tensor shares its memory
+        self._states = np.zeros((n_pol, STATE_DIM), dtype=np.float32)
+        self._states_tensor = torch.from_numpy(self._states)
+
+        # Latest unevaluated tick per symbol, drained by `run`
+        self._pending: Dict[str, tuple] = {}
+        self._ready = asyncio.Event()
+        self.skipped = 0
+
+        # Cost of evaluating the whole pool per tick; policies run as one
+        # batch, so there is no separate figure per policy
+        self.ticks = 0
+        self.latency_ewma = 0.0
+        self.latency_max = 0.0
+        self.production_ewma = 0.0  # The bot's own tick handling, for comparison
+
+    @classmethod
+    def from_checkpoints(cls, paths: List[str], symbols: List[str], **kwargs) -> "ShadowPool":
+        """Build a pool from ActorCritic state_dict files, named by file stem"""
+        policies = {}
+        action_dim = None
+        for path in paths:
+            state_dict = torch.load(path, map_location='cpu', weights_only=True)
+            input_dim = state_dict['shared.0.weight'].shape[1]
+            if input_dim != STATE_DIM:
+                raise ValueError(f"Checkpoint {path} expects {input_dim} inputs, shadow state has {STATE_DIM}")
+            action_dim = action_dim or state_dict['actor.0.weight'].shape[0]
+            policy = ActorCritic(STATE_DIM, action_dim)
+            try:
+                policy.load_state_dict(state_dict)
+            except RuntimeError as e:
+                raise ValueError(f"Checkpoint {path} does not match the pool's architecture: {e}") from e
+            policies[Path(path).stem] = policy
+        return cls(policies, symbols, **kwargs)
+
+    def _to_account_ccy(self, s: int, amount: np.ndarray) -> np.ndarray:
+        if self.quote_is_account_ccy[s]:
+            return amount
+        if self.base_is_account_ccy[s]:
+            return amount / ((self.bid[s] + self.ask[s]) / 2)
+        return amount
+
+    def _mark(self, s: int):
+        units = self.units[:, s]
+        exit_price = np.where(units > 0, self.bid[s], self.ask[s])
+        self.unrealized[:, s] = self._to_account_ccy(s, units * (exit_price - self.avg_price[:, s]))
+
+    def equity(self) -> np.ndarray:
+        return self.balance + self.realized + self.unrealized.sum(axis=1)
+
+    def submit(self, tick: Tick, features: dict, production_latency: Optional[float] = None):
+        """Queue a tick for evaluation by `run`; never evaluates on the caller's path.
+
+        `production_latency` is how long the bot spent on this tick itself,
+        which the report compares the pool's cost against.
+        """
+        if tick.symbol not in self.symbol_index:
+            return
+        if tick.symbol in self._pending:
+            self.skipped += 1
+        self._pending[tick.symbol] = (tick, features)
+        self._ready.set()
+        if production_latency is not None:
+            self.production_ewma = (production_latency if self.production_ewma == 0.0
+                                    else 0.99 * self.production_ewma + 0.01 * production_latency)
+
+    async def run(self):
+        """Evaluate queued ticks in the shadow thread, latest per symbol"""
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while self._pending:
+                tick, features = self._pending.pop(next(iter(self._pending)))
+                try:
+                    await asyncio.get_running_loop().run_in_executor(_shadow_executor, self.on_tick, tick, features)
+                except Exception as e:
+                    logger.error(f"Shadow evaluation error: {str(e)}", exc_info=True)
+
+    def on_tick(self, tick: Tick, features: dict):
+        """Decide and fill for every policy on one tick"""
+        s = self.symbol_index.get(tick.symbol)
+        if s is None:
+            return
+        started = time.perf_counter()
+        self.bid[s], self.ask[s] = tick.bid, tick.ask
+
+        # Shared market features plus each policy's own position and PnL
+        position = self.env_position[:, s]
+        states = self._states
+        states[:, :-2] = market_state(features)
+        np.divide(position, settings.DEFAULT_LOT_SIZE, out=states[:, -2])
+        np.multiply(position, features['mid_price'] - self.env_entry[:, s], out=states[:, -1])
+
+        actions = self._act(self._states_tensor)
+        self._execute(s, actions)
+        self._mark(s)
+
+        equity = self.equity()
+        self.peak_equity = np.maximum(self.peak_equity, equity)
+        self.max_drawdown = np.maximum(self.max_drawdown, (self.peak_equity - equity) / self.peak_equity)
+
+        elapsed = time.perf_counter() - started
+        self.ticks += 1
+        self.latency_ewma = elapsed if self.ticks == 1 else 0.99 * self.latency_ewma + 0.01 * elapsed
+        self.latency_max = max(self.latency_max, elapsed)
+
+    def _run_layers(self, prefix: str, layers, x: torch.Tensor) -> torch.Tensor:
+        """Apply a Sequential to row i of x with policy i's weights, as batched matmuls"""
+        for name, layer in layers:
+            if isinstance(layer, nn.Linear):
+                weight = self.params[f"{prefix}.{name}.weight"]
+                bias = self.params[f"{prefix}.{name}.bias"]
+                x = torch.baddbmm(bias, x.unsqueeze(1), weight).squeeze(1)
+            else:
+                x = layer(x)  # Parameter-free activations work row-wise as is
+        return x
+
+    def _act(self, states: torch.Tensor) -> np.ndarray:
+        with torch.no_grad():
+            probs = self._run_layers('actor', self._actor, self._run_layers('shared', self._shared, states))
+            if check_for_nans(probs, "shadow action probabilities"):
+                probs = torch.nan_to_num(probs, nan=1.0 / self.action_dim)
+            # Inverse-CDF sampling, one uniform draw per policy
+            u = torch.rand(probs.shape[0], 1) * probs.sum(dim=1, keepdim=True)
+            return (probs.cumsum(dim=1) < u).sum(dim=1).clamp(max=self.action_dim - 1).numpy()
+
+    def _execute(self, s: int, actions: np.ndarray):
+        position = self.env_position[:, s]
+        buy = (actions == 1) & (position <= 0)
+        idx = np.flatnonzero(buy | ((actions == 2) & (position >= 0)))
+        if idx.size == 0:
+            return
+        buy = buy[idx]
+
+        # Same sizing rule as TradingEnv._calculate_position_size
+        entry = self.env_entry[idx, s]
+        quantity = np.round(self._order_notional / np.where(entry > 0, entry, 1.0), self.precision[s])
+        signed = np.where(buy, quantity, -quantity)
+        price = np.where(buy, self.ask[s], self.bid[s])
+
+        # Net into the ledger, realising PnL on any closed portion
+        units = self.units[idx, s]
+        avg = self.avg_price[idx, s]
+        new_units = units + signed
+        adding = units * signed >= 0
+        closed = np.where(adding, 0.0, np.copysign(np.minimum(np.abs(units), quantity), units))
+        self.realized[idx] += self._to_account_ccy(s, closed * (price - avg))
+
+        blended = np.divide(units * avg + signed * price, new_units, out=avg.copy(), where=new_units != 0)
+        new_avg = np.where(adding, blended, np.where(new_units * units < 0, price, avg))
+        new_avg[new_units == 0] = 0.0
+        self.avg_price[idx, s] = new_avg
+        self.units[idx, s] = new_units
+        self.trades[idx] += 1
+
+        self.env_position[idx, s] = signed
+        self.env_entry[idx, s] = price
+
+    def report(self) -> List[dict]:
+        """Per-policy PnL and drawdown"""
+        equity = self.equity()
+        return [
+            {
+                'policy': name,
+                'pnl': float(equity[i] - self.balance),
+                'realized': float(self.realized[i]),
+                'max_drawdown': float(self.max_drawdown[i]),
+                'trades': int(self.trades[i])
+            }
+            for i, name in enumerate(self.names)
+        ]
+
+    def format_report(self) -> str:
+        share = self.latency_ewma / self.production_ewma if self.production_ewma > 0 else float('nan')
+        lines = [
+            f"Shadow pool: {len(self.names)} policies, {self.ticks} ticks evaluated, {self.skipped} skipped",
+            f"Evaluation time per tick, measured for the whole pool only (policies run as one batch): "
+            f"avg {self.latency_ewma * 1000:.2f}ms max {self.latency_max * 1000:.2f}ms, "
+            f"{share:.0%} of the {self.production_ewma * 1000:.2f}ms production tick, spent in the "
+            f"shadow thread rather than on the order path",
+            f"{'policy':<24} {'pnl':>10} {'max_dd':>8} {'trades':>7}"
+        ]
+        for r in sorted(self.report(), key=lambda r: r['pnl'], reverse=True):
+            lines.append(f"{r['policy']:<24} {r['pnl']:>10.2f} {r['max_drawdown']:>8.2%} "
+                         f"{r['trades']:>7}")
+        return "\n".join(lines)
+
+    async def report_loop(self, interval: float = settings.SHADOW_REPORT_INTERVAL):
+        while True:
+            await asyncio.sleep(interval)
+            logger.info(self.format_report())